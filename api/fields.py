@@ -0,0 +1,133 @@
+"""Описание полей ответа API и выбор их подмножества (`?fields=`).
+
+Каждое поле знает, какие колонки ему нужны, поэтому запрос к базе
+читает только то, что клиент попросил, — например, без `text`
+у ленты заголовков.
+"""
+from django.urls import reverse
+
+
+class BadRequest(Exception):
+    pass
+
+
+class Field:
+    def __init__(self, columns, get):
+        self.columns = columns
+        self.get = get
+
+
+class FieldSet:
+    def __init__(self, fields, default, required=()):
+        self.fields = fields
+        self.default = default
+        self.required = tuple(required)
+
+    def select(self, request):
+        """Имена полей из `?fields=` или поля по умолчанию."""
+        raw = request.GET.get('fields')
+        if not raw:
+            return self.default
+        names = tuple(name.strip() for name in raw.split(',') if name.strip())
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise BadRequest(
+                f'Неизвестные поля: {", ".join(unknown)}; доступны: '
+                f'{", ".join(self.fields)}'
+            )
+        return names
+
+    def columns(self, names):
+        columns = list(self.required)
+        for name in names:
+            for column in self.fields[name].columns:
+                if '__' in column:
+                    columns.append(column.split('__')[0])
+                columns.append(column)
+        return list(dict.fromkeys(columns))
+
+    def related(self, names):
+        """Связи, которые нужно подтянуть через select_related."""
+        return [column.split('__')[0] for column in self.columns(names)
+                if '__' in column]
+
+    def dump(self, obj, names):
+        return {name: self.fields[name].get(obj) for name in names}
+
+
+def _date(value):
+    return value.isoformat() if value else None
+
+
+def _image(post):
+    if not post.image:
+        return None
+    variants = post.variants
+    return {
+        'url': post.image.url,
+        'src': variants.get('src'),
+        'jpeg_srcset': variants.get('jpeg_srcset'),
+        'webp_srcset': variants.get('webp_srcset'),
+        'placeholder': variants.get('placeholder'),
+    }
+
+
+POST = FieldSet(
+    {
+        'id': Field(['id'], lambda post: post.pk),
+        'text': Field(['text'], lambda post: post.text),
+        'pub_date': Field(['pub_date'], lambda post: _date(post.pub_date)),
+        'author': Field(['author__username'],
+                        lambda post: post.author.username),
+        'group': Field(['group__slug'],
+                       lambda post: post.group.slug if post.group else None),
+        'image': Field(['image', 'image_variants'], _image),
+        'comment_count': Field(['comment_count'],
+                               lambda post: post.comment_count),
+        'url': Field(['author__username'], lambda post: reverse(
+            'post', args=[post.author.username, post.pk])),
+    },
+    default=('id', 'author', 'group', 'text', 'pub_date', 'image',
+             'comment_count', 'url'),
+    required=('id', 'pub_date'),
+)
+
+COMMENT = FieldSet(
+    {
+        'id': Field(['id'], lambda comment: comment.pk),
+        'author': Field(['author__username'],
+                        lambda comment: comment.author.username),
+        'text': Field(['text'], lambda comment: comment.text),
+        'created': Field(['created'],
+                         lambda comment: _date(comment.created)),
+    },
+    default=('id', 'author', 'text', 'created'),
+    required=('id', 'created'),
+)
+
+GROUP = FieldSet(
+    {
+        'slug': Field(['slug'], lambda group: group.slug),
+        'title': Field(['title'], lambda group: group.title),
+        'description': Field(['description'],
+                             lambda group: group.description),
+        'url': Field(['slug'],
+                     lambda group: reverse('group', args=[group.slug])),
+    },
+    default=('slug', 'title', 'description', 'url'),
+    required=('id', 'title'),
+)
+
+PROFILE = FieldSet(
+    {
+        'username': Field([], lambda stats: stats.user.username),
+        'full_name': Field([], lambda stats: stats.user.get_full_name()),
+        'posts_count': Field([], lambda stats: stats.posts_count),
+        'followers_count': Field([], lambda stats: stats.followers_count),
+        'following_count': Field([], lambda stats: stats.following_count),
+        'url': Field([], lambda stats: reverse(
+            'profile', args=[stats.user.username])),
+    },
+    default=('username', 'full_name', 'posts_count', 'followers_count',
+             'following_count', 'url'),
+)
@@ -0,0 +1,145 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.paginator import BACKWARD, FORWARD, CursorPaginator
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create(username='author',
+                                         first_name='Лев', last_name='Т')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(title='group', slug='group',
+                                         description='description')
+        cls.posts = [
+            Post.objects.create(text=f'text {number}', author=cls.author,
+                                group=cls.group if number % 2 else None)
+            for number in range(5)
+        ]
+        cls.post = cls.posts[-1]
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text='visible', active=True)
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text='hidden', active=False)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def get(self, name, *args, client=None, **params):
+        response = (client or Client()).get(
+            reverse(f'api:{name}', args=args), params
+        )
+        return response
+
+    def test_posts_cursor_paging(self):
+
+        """Лента постов листается курсором до конца."""
+
+        response = self.get('posts', limit=2)
+        self.assertEqual(response['Content-Type'],
+                         'application/json; charset=utf-8')
+        data = response.json()
+        seen = [post['id'] for post in data['results']]
+        while data['next']:
+            data = self.get('posts', limit=2, cursor=data['next']).json()
+            seen.extend(post['id'] for post in data['results'])
+        self.assertEqual(seen, [post.id for post in reversed(self.posts)])
+
+    def test_sparse_fields(self):
+
+        """`fields` ограничивает и ответ, и читаемые колонки."""
+
+        with self.assertNumQueries(1) as queries:
+            data = self.get('posts', fields='id,group').json()
+        self.assertEqual(set(data['results'][0]), {'id', 'group'})
+        self.assertNotIn('"text"', queries.captured_queries[0]['sql'])
+        self.assertNotIn('auth_user', queries.captured_queries[0]['sql'])
+
+        response = self.get('posts', fields='id,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['error'])
+
+    def test_filters_and_detail(self):
+
+        """Посты фильтруются по группе и автору, доступны по id."""
+
+        data = self.get('posts', group='group').json()
+        self.assertEqual(len(data['results']), 2)
+        data = self.get('posts', author='reader').json()
+        self.assertEqual(data['results'], [])
+        data = self.get('post', self.post.id).json()
+        self.assertEqual(data['url'], f'/author/{self.post.id}/')
+        # скрытый комментарий в счётчик не входит
+        self.assertEqual(data['comment_count'], 1)
+        self.assertEqual(self.get('post', 999).status_code, 404)
+
+    def test_comments_skip_inactive(self):
+
+        """Скрытые модерацией комментарии в API не попадают."""
+
+        data = self.get('comments', self.post.id).json()
+        self.assertEqual([comment['text'] for comment in data['results']],
+                         ['visible'])
+
+    def test_groups_and_profile(self):
+
+        """Группы и профиль отдаются с счётчиками."""
+
+        self.assertEqual(self.get('groups').json()['results'][0]['slug'],
+                         'group')
+        self.assertEqual(self.get('group', 'group').json()['description'],
+                         'description')
+        data = self.get('profile', 'author').json()
+        self.assertEqual(data['full_name'], 'Лев Т')
+        self.assertEqual(data['posts_count'], 5)
+        self.assertEqual(data['followers_count'], 1)
+
+    def test_follow_feed(self):
+
+        """Лента подписок доступна только авторизованным."""
+
+        self.assertEqual(self.get('follow').status_code, 401)
+        client = Client()
+        client.force_login(self.reader)
+        with self.assertNumQueries(4) as queries:
+            response = self.get('follow', client=client, fields='id')
+        self.assertEqual(len(response.json()['results']), 5)
+        self.assertEqual(set(response.json()['results'][0]), {'id'})
+        self.assertIn('private', response['Cache-Control'])
+        # посты ленты читаются только с запрошенными колонками
+        self.assertNotIn('"text"', queries.captured_queries[-1]['sql'])
+        self.assertNotIn('auth_user', queries.captured_queries[-1]['sql'])
+
+    def test_empty_cursor_page(self):
+
+        """Курсор за концом ленты или из другой ленты даёт пустую
+        страницу в JSON, а не ошибку."""
+
+        paginator = CursorPaginator(Post.objects.all(), 1)
+        cases = (
+            {'cursor': paginator.encode(FORWARD, self.posts[0])},
+            {'group': 'group',
+             'cursor': paginator.encode(BACKWARD, self.posts[-1])},
+        )
+        for params in cases:
+            with self.subTest(**params):
+                response = self.get('posts', **params)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), {
+                    'results': [], 'next': None, 'previous': None,
+                })
+
+    def test_conditional_get(self):
+
+        """Повторный запрос с ETag получает 304; писать нельзя."""
+
+        response = self.get('posts')
+        self.assertIn('max-age=', response['Cache-Control'])
+        response = Client().get(reverse('api:posts'),
+                                HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(Client().post(reverse('api:posts')).status_code,
+                         405)
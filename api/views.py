@@ -0,0 +1,164 @@
+"""Read-only JSON API для мобильного клиента.
+
+Ответы собираются из словарей без шаблонов, поля выбираются через
+`?fields=`, списки листаются курсором (`?cursor=`, `?limit=`), а ETag
+от тела ответа позволяет клиенту получить 304 вместо повторной выдачи.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control, patch_vary_headers)
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_safe
+
+from posts import counters, timeline
+from posts.models import Comment, Group, Post
+from posts.paginator import CursorPaginator
+
+from . import fields
+from .fields import BadRequest
+
+User = get_user_model()
+
+MAX_LIMIT = 100
+
+
+def _json(data, status=200):
+    body = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return HttpResponse(body.encode(), status=status,
+                        content_type='application/json; charset=utf-8')
+
+
+def api_view(private=False):
+    """GET/HEAD, ошибки в JSON, ETag и заголовки кэширования."""
+    def decorator(view):
+        @require_safe
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            try:
+                data = view(request, *args, **kwargs)
+            except BadRequest as error:
+                return _json({'error': str(error)}, status=400)
+            except Http404:
+                return _json({'error': 'Не найдено'}, status=404)
+            if isinstance(data, HttpResponse):
+                return data
+            response = _json(data)
+            etag = quote_etag(hashlib.md5(response.content).hexdigest())
+            response = get_conditional_response(
+                request, etag=etag, response=response
+            )
+            response['ETag'] = etag
+            if private:
+                patch_vary_headers(response, ('Cookie',))
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(
+                    response, public=True,
+                    max_age=getattr(settings, 'API_CACHE_MAX_AGE', 30),
+                )
+            return response
+        return wrapped
+    return decorator
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.PAGINATOR_PAGE_SIZE))
+    except ValueError:
+        raise BadRequest('limit должен быть числом')
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def _sparse(queryset, fieldset, names):
+    related = fieldset.related(names)
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*fieldset.columns(names))
+
+
+def _page(request, paginator, fieldset, names):
+    page = paginator.get_page(request.GET.get('cursor'))
+    return {
+        'results': [fieldset.dump(obj, names) for obj in page.object_list],
+        'next': page.next_cursor(),
+        'previous': page.previous_cursor(),
+    }
+
+
+@api_view()
+def posts(request):
+    names = fields.POST.select(request)
+    queryset = Post.objects.all()
+    if 'group' in request.GET:
+        queryset = queryset.filter(group__slug=request.GET['group'])
+    if 'author' in request.GET:
+        queryset = queryset.filter(author__username=request.GET['author'])
+    paginator = CursorPaginator(_sparse(queryset, fields.POST, names),
+                                _limit(request))
+    return _page(request, paginator, fields.POST, names)
+
+
+@api_view()
+def post_detail(request, post_id):
+    names = fields.POST.select(request)
+    post = get_object_or_404(_sparse(Post.objects, fields.POST, names),
+                             pk=post_id)
+    return fields.POST.dump(post, names)
+
+
+@api_view()
+def comments(request, post_id):
+    names = fields.COMMENT.select(request)
+    get_object_or_404(Post.objects.only('id'), pk=post_id)
+    queryset = Comment.objects.visible().filter(post_id=post_id)
+    paginator = CursorPaginator(
+        _sparse(queryset, fields.COMMENT, names), _limit(request),
+        ordering=('created', 'id'),
+    )
+    return _page(request, paginator, fields.COMMENT, names)
+
+
+@api_view()
+def groups(request):
+    names = fields.GROUP.select(request)
+    paginator = CursorPaginator(
+        _sparse(Group.objects, fields.GROUP, names), _limit(request),
+        ordering=('title', 'id'),
+    )
+    return _page(request, paginator, fields.GROUP, names)
+
+
+@api_view()
+def group_detail(request, slug):
+    names = fields.GROUP.select(request)
+    group = get_object_or_404(_sparse(Group.objects, fields.GROUP, names),
+                              slug=slug)
+    return fields.GROUP.dump(group, names)
+
+
+@api_view()
+def profile(request, username):
+    names = fields.PROFILE.select(request)
+    author = get_object_or_404(User, username=username)
+    stats = counters.stats_for(author)
+    stats.user = author
+    return fields.PROFILE.dump(stats, names)
+
+
+@api_view(private=True)
+def follow_feed(request):
+    if not request.user.is_authenticated:
+        return _json({'error': 'Нужна авторизация'}, status=401)
+    names = fields.POST.select(request)
+    paginator = timeline.paginator_for(
+        request.user, _limit(request),
+        posts=_sparse(Post.objects, fields.POST, names),
+    )
+    return _page(request, paginator, fields.POST, names)
@@ -0,0 +1,108 @@
+"""Синтетические данные для замеров: пользователи, группы, посты,
+комментарии и подписки в заданных количествах.
+
+Строки пишутся через `bulk.insert`, поэтому сигналы не срабатывают;
+счётчики, ленты подписок и поисковый индекс после вставки
+пересчитываются через `posts.bulk.rebuild`, как после импорта.
+"""
+import itertools
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from posts import bulk
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+PERIOD = timedelta(days=365)
+WORDS = (
+    'котики собаки лето зима город дорога книга музыка кино утро вечер '
+    'работа отпуск море горы лес река друзья семья проект код база '
+    'данные сервер запрос страница лента подписка новости погода кофе '
+    'чай завтрак путешествие поезд самолёт фотография картина выставка '
+    'концерт спорт бег велосипед футбол шахматы история наука космос'
+).split()
+
+
+class DataExists(Exception):
+    pass
+
+
+def _insert(model, objects, batch_size):
+    """Вставлять пачками, не собирая все объекты в памяти; даты
+    сохраняются как заданы."""
+    objects = iter(objects)
+    while True:
+        batch = list(itertools.islice(objects, batch_size))
+        if not batch:
+            return
+        bulk.insert(model, batch)
+
+
+def _text(rng, low, high):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def prefix(seed):
+    return f'bench-{seed}-'
+
+
+def generate(users=100, groups=10, posts=1000, comments=3000, follows=1000,
+             seed=0, batch_size=BATCH_SIZE, stdout=None):
+    """Заполнить базу; вернуть число созданных объектов каждого вида."""
+    rng = random.Random(seed)
+    name = prefix(seed)
+    if User.objects.filter(username__startswith=name).exists():
+        raise DataExists(f'Данные с префиксом {name} уже есть')
+    now = timezone.now()
+    password = make_password(None)
+
+    users = (User(username=f'{name}{number}', password=password)
+             for number in range(users))
+    _insert(User, users, batch_size)
+    user_ids = list(User.objects.filter(
+        username__startswith=name).values_list('id', flat=True))
+
+    groups = (Group(title=f'Группа {number}', slug=f'{name}{number}',
+                    description=_text(rng, 5, 20))
+              for number in range(groups))
+    _insert(Group, groups, batch_size)
+    group_ids = list(Group.objects.filter(
+        slug__startswith=name).values_list('id', flat=True))
+
+    posts = (Post(author_id=rng.choice(user_ids),
+                  group_id=(rng.choice(group_ids)
+                            if group_ids and rng.random() < 0.8 else None),
+                  text=_text(rng, 5, 60),
+                  pub_date=now - PERIOD * rng.random())
+             for _ in range(posts))
+    _insert(Post, posts, batch_size)
+    post_dates = list(Post.objects.filter(
+        author_id__in=user_ids).values_list('id', 'pub_date'))
+
+    def comment():
+        post_id, pub_date = rng.choice(post_dates)
+        return Comment(post_id=post_id, author_id=rng.choice(user_ids),
+                       text=_text(rng, 3, 20), active=rng.random() < 0.8,
+                       created=min(now, pub_date + PERIOD / 50 * rng.random()))
+
+    if post_dates:
+        _insert(Comment, (comment() for _ in range(comments)), batch_size)
+
+    pairs = set()
+    limit = min(follows, len(user_ids) * (len(user_ids) - 1))
+    while len(pairs) < limit:
+        user_id, author_id = rng.sample(user_ids, 2)
+        pairs.add((user_id, author_id))
+    _insert(Follow, (Follow(user_id=user_id, author_id=author_id)
+                     for user_id, author_id in sorted(pairs)), batch_size)
+
+    bulk.rebuild(stdout)
+    return {'users': len(user_ids), 'groups': len(group_ids),
+            'posts': len(post_dates), 'comments': comments if post_dates
+            else 0, 'follows': len(pairs)}
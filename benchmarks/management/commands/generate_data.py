@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import data
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу синтетическими данными для замеров'
+
+    def add_arguments(self, parser):
+        for name, default in (('users', 100), ('groups', 10),
+                              ('posts', 1000), ('comments', 3000),
+                              ('follows', 1000)):
+            parser.add_argument(f'--{name}', type=int, default=default)
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора; от него зависят имена и содержимое',
+        )
+        parser.add_argument('--batch-size', type=int,
+                            default=data.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            created = data.generate(
+                users=options['users'], groups=options['groups'],
+                posts=options['posts'], comments=options['comments'],
+                follows=options['follows'], seed=options['seed'],
+                batch_size=options['batch_size'], stdout=self.stdout,
+            )
+        except data.DataExists as error:
+            raise CommandError(f'{error}; укажите другой --seed')
+        self.stdout.write(self.style.SUCCESS(', '.join(
+            f'{name}: {count}' for name, count in created.items()
+        )))
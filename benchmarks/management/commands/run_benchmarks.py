@@ -0,0 +1,59 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from benchmarks.runner import Benchmark, compare, template_settings
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку, число запросов и размер ответа страниц. '
+            'new_post и add_comment пишут в базу — запускайте на копии '
+            'с данными из generate_data')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Запросов на каждую страницу')
+        parser.add_argument('--warmup', type=int, default=5,
+                            help='Неучитываемых запросов перед замером')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Сколько клиентов шлют запросы одновременно')
+        parser.add_argument('--view-threads', type=int,
+                            help='Переопределить VIEW_THREADS; 0 — '
+                                 'независимые запросы страницы по очереди')
+        parser.add_argument('--template-cache', choices=('on', 'off'),
+                            help='Включить или выключить кэширующий '
+                                 'загрузчик шаблонов')
+        parser.add_argument('--only', nargs='+', metavar='NAME',
+                            help='Замерить только эти страницы')
+        parser.add_argument('--output', help='Записать отчёт в JSON-файл')
+        parser.add_argument('--compare', metavar='JSON',
+                            help='Сравнить с отчётом прошлого релиза')
+
+    def handle(self, *args, **options):
+        overrides = {}
+        if options['view_threads'] is not None:
+            overrides['VIEW_THREADS'] = options['view_threads']
+        if options['template_cache']:
+            overrides['TEMPLATES'] = template_settings(
+                options['template_cache'] == 'on')
+        with override_settings(**overrides):
+            benchmark = Benchmark(requests=options['requests'],
+                                  warmup=options['warmup'],
+                                  seed=options['seed'],
+                                  concurrency=options['concurrency'])
+            report = benchmark.run(only=options['only'])
+        text = json.dumps(report, indent=2, sort_keys=True,
+                          ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(text + '\n')
+            self.stdout.write(f'Отчёт записан в {options["output"]}')
+        else:
+            self.stdout.write(text)
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                old = json.load(file)
+            for line in compare(old, report):
+                self.stdout.write(line)
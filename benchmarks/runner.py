@@ -0,0 +1,256 @@
+"""Замеры страниц yatube через тестовый клиент Django.
+
+Для каждой страницы из `posts/urls.py` снимаются задержка (p50/p95/p99),
+число SQL-запросов и размер ответа, а при `concurrency` > 1 — ещё
+и пропускная способность: запросы идут из нескольких потоков сразу,
+как от разных клиентов. Отчёт — JSON с отсортированными
+ключами, чтобы результаты двух релизов можно было сравнить `diff`-ом
+или через `compare()`.
+"""
+import copy
+import math
+import platform
+import random
+import re
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post
+
+from .data import WORDS
+
+User = get_user_model()
+
+SAMPLE_SIZE = 1000
+PERCENTILES = (50, 95, 99)
+# Адрес не из INTERNAL_IPS, чтобы debug toolbar не встраивался в ответы.
+REMOTE_ADDR = '192.0.2.1'
+# число запросов из заголовка Server-Timing, с учётом потоков yatube.parallel
+SERVER_TIMING_QUERIES = re.compile(r'"(\d+) queries"')
+SERVER_TIMING_TEMPLATE = re.compile(r'tpl;dur=([\d.]+)')
+
+
+def percentile(values, percent):
+    """Процентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def template_settings(cached):
+    """TEMPLATES с кэширующим загрузчиком или без него."""
+    loaders = list(settings.TEMPLATE_LOADERS)
+    if cached:
+        loaders = [('django.template.loaders.cached.Loader', loaders)]
+    templates = copy.deepcopy(settings.TEMPLATES)
+    for engine in templates:
+        engine['OPTIONS']['loaders'] = loaders
+    return templates
+
+
+def summarize(samples, seconds=None):
+    latency = [sample['seconds'] * 1000 for sample in samples]
+    queries = [sample['queries'] for sample in samples]
+    sizes = [sample['bytes'] for sample in samples]
+    templates = [sample['template_ms'] for sample in samples]
+    result = {
+        'requests': len(samples),
+        'status': dict(Counter(str(sample['status']) for sample in samples)),
+        'latency_ms': {f'p{percent}': round(percentile(latency, percent), 3)
+                       for percent in PERCENTILES},
+        'queries': {'mean': round(statistics.mean(queries), 2),
+                    'max': max(queries)},
+        'bytes': {'mean': round(statistics.mean(sizes)),
+                  'max': max(sizes)},
+        'template_ms': {'mean': round(statistics.mean(templates), 3),
+                        'p95': round(percentile(templates, 95), 3)},
+    }
+    result['latency_ms']['mean'] = round(statistics.mean(latency), 3)
+    result['latency_ms']['max'] = round(max(latency), 3)
+    if seconds:
+        result['throughput_rps'] = round(len(samples) / seconds, 1)
+    return result
+
+
+class Benchmark:
+    """Набор сценариев: имя страницы и функция, возвращающая запрос."""
+
+    def __init__(self, requests=50, warmup=5, seed=0, concurrency=1):
+        self.requests = requests
+        self.warmup = warmup
+        self.concurrency = concurrency
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.posts = list(Post.objects.values_list(
+            'author__username', 'id')[:SAMPLE_SIZE])
+        self.groups = list(Group.objects.values_list(
+            'slug', flat=True)[:SAMPLE_SIZE])
+        self.usernames = list(User.objects.values_list(
+            'username', flat=True)[:SAMPLE_SIZE])
+        self.reader = User.objects.annotate(
+            subscriptions=Count('follower')
+        ).order_by('-subscriptions', 'id').first()
+        self.clients = threading.local()
+
+    @property
+    def anonymous(self):
+        return self._clients().anonymous
+
+    @property
+    def client(self):
+        return self._clients().client
+
+    def _clients(self):
+        # у каждого потока свои клиенты: куки Client не потокобезопасны
+        clients = self.clients
+        if not hasattr(clients, 'anonymous'):
+            clients.anonymous = Client(REMOTE_ADDR=REMOTE_ADDR)
+            clients.client = Client(REMOTE_ADDR=REMOTE_ADDR)
+            if self.reader is not None:
+                clients.client.force_login(self.reader)
+        return clients
+
+    def scenarios(self):
+        scenarios = {
+            'index': lambda: (self.anonymous.get, reverse('index'), None),
+            'search': lambda: (self.anonymous.get, reverse('search'),
+                               {'q': self.rng.choice(WORDS)}),
+        }
+        if self.groups:
+            scenarios['group_posts'] = lambda: (
+                self.anonymous.get,
+                reverse('group', args=[self.rng.choice(self.groups)]), None)
+        if self.usernames:
+            scenarios['profile'] = lambda: (
+                self.anonymous.get,
+                reverse('profile', args=[self.rng.choice(self.usernames)]),
+                None)
+        if self.posts:
+            scenarios['post_view'] = lambda: (
+                self.anonymous.get,
+                reverse('post', args=self.rng.choice(self.posts)), None)
+        if self.reader is not None:
+            scenarios['follow_index'] = lambda: (
+                self.client.get, reverse('follow_index'), None)
+            scenarios['new_post'] = lambda: (
+                self.client.post, reverse('new'),
+                {'text': self._text(), 'group': ''})
+        if self.reader is not None and self.posts:
+            scenarios['add_comment'] = lambda: (
+                self.client.post,
+                reverse('add_comment', args=self.rng.choice(self.posts)),
+                {'text': self._text()})
+        return scenarios
+
+    def _text(self):
+        return 'benchmark ' + ' '.join(self.rng.sample(WORDS, 8))
+
+    def measure(self, request):
+        method, path, data = request()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = method(path, data) if data else method(path)
+            if response.streaming:
+                body = b''.join(response.streaming_content)
+            else:
+                body = response.content
+            seconds = time.perf_counter() - start
+        timing = response.get('Server-Timing', '')
+        count = SERVER_TIMING_QUERIES.search(timing)
+        template = SERVER_TIMING_TEMPLATE.search(timing)
+        return {'seconds': seconds,
+                'queries': int(count.group(1)) if count else len(queries),
+                'template_ms': float(template.group(1)) if template else 0.0,
+                'bytes': len(body), 'status': response.status_code}
+
+    def _measure_in_thread(self, request):
+        try:
+            return self.measure(request)
+        finally:
+            close_old_connections()
+
+    def _samples(self, request, count):
+        if self.concurrency < 2:
+            return [self.measure(request) for _ in range(count)]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return list(pool.map(self._measure_in_thread,
+                                 [request] * count))
+
+    def run(self, only=None):
+        endpoints = {}
+        for name, request in self.scenarios().items():
+            if only and name not in only:
+                continue
+            self._samples(request, self.warmup)
+            start = time.perf_counter()
+            samples = self._samples(request, self.requests)
+            endpoints[name] = summarize(samples,
+                                        time.perf_counter() - start)
+        return {'meta': self.meta(), 'endpoints': endpoints}
+
+    def meta(self):
+        cache = settings.CACHES['default']['BACKEND']
+        return {
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'cache': cache,
+            'debug': settings.DEBUG,
+            'requests': self.requests,
+            'warmup': self.warmup,
+            'seed': self.seed,
+            'concurrency': self.concurrency,
+            'view_threads': getattr(settings, 'VIEW_THREADS', 0),
+            'template_loaders': [
+                loader if isinstance(loader, str) else loader[0]
+                for engine in settings.TEMPLATES
+                for loader in engine.get('OPTIONS', {}).get('loaders', ())
+            ],
+            'dataset': {
+                'users': User.objects.count(),
+                'groups': Group.objects.count(),
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'follows': Follow.objects.count(),
+            },
+        }
+
+
+def compare(old, new, metric='p95'):
+    """Строки с изменением задержки `metric` по каждой странице."""
+    lines = []
+    for name, result in sorted(new['endpoints'].items()):
+        after = result['latency_ms'][metric]
+        before = old['endpoints'].get(name, {}).get('latency_ms', {}).get(
+            metric)
+        if not before:
+            lines.append(f'{name}: {metric} {after} мс (новая)')
+            continue
+        change = (after - before) / before * 100
+        queries = (result['queries']['mean']
+                   - old['endpoints'][name]['queries']['mean'])
+        line = (f'{name}: {metric} {before} → {after} мс '
+                f'({change:+.1f}%), запросов {queries:+.2f}')
+        rps = old['endpoints'][name].get('throughput_rps')
+        if rps:
+            line += f', {rps} → {result["throughput_rps"]} запр/с'
+        template = old['endpoints'][name].get('template_ms')
+        if template:
+            line += (f', шаблоны {template["mean"]} → '
+                     f'{result["template_ms"]["mean"]} мс')
+        lines.append(line)
+    return lines
@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from benchmarks import data
+from benchmarks.runner import (Benchmark, compare, percentile,
+                               template_settings)
+from posts.models import Comment, Follow, Post, TimelineEntry
+
+
+class BenchmarkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.created = data.generate(users=5, groups=2, posts=30,
+                                    comments=20, follows=8, stdout=StringIO())
+
+    def test_generate(self):
+
+        """Генератор создаёт заданное число объектов и пересчитывает
+        производные данные."""
+
+        self.assertEqual(self.created, {'users': 5, 'groups': 2,
+                                        'posts': 30, 'comments': 20,
+                                        'follows': 8})
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Comment.objects.count(), 20)
+        self.assertEqual(Follow.objects.count(), 8)
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertGreater(len(set(
+            Post.objects.values_list('pub_date', flat=True))), 1)
+        with self.assertRaises(data.DataExists):
+            data.generate(users=1, stdout=StringIO())
+
+    def test_run(self):
+
+        """Отчёт содержит все страницы с задержкой, запросами и
+        размером ответа."""
+
+        report = Benchmark(requests=3, warmup=1).run()
+        self.assertEqual(set(report['endpoints']), {
+            'index', 'search', 'group_posts', 'profile', 'post_view',
+            'follow_index', 'new_post', 'add_comment',
+        })
+        for name, result in report['endpoints'].items():
+            with self.subTest(name):
+                self.assertEqual(result['requests'], 3)
+                self.assertTrue(set(result['status']) <= {'200', '302'})
+                self.assertIn('p99', result['latency_ms'])
+                self.assertIn('mean', result['queries'])
+                self.assertGreater(result['throughput_rps'], 0)
+                self.assertIn('mean', result['template_ms'])
+                if '200' in result['status']:
+                    self.assertGreater(result['bytes']['max'], 0)
+        self.assertEqual(report['meta']['dataset']['follows'], 8)
+
+    def test_command_and_compare(self):
+
+        """Команда пишет JSON, который можно сравнить с прошлым отчётом."""
+
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'bench.json')
+        call_command('run_benchmarks', requests=2, warmup=0,
+                     only=['index'], output=path, stdout=StringIO())
+        with open(path, encoding='utf-8') as file:
+            report = json.load(file)
+        os.remove(path)
+        os.rmdir(directory)
+        self.assertEqual(list(report['endpoints']), ['index'])
+        self.assertEqual(report['meta']['concurrency'], 1)
+        lines = compare(report, report)
+        self.assertEqual(len(lines), 1)
+        self.assertIn('запр/с', lines[0])
+
+    def test_percentile(self):
+
+        """Процентили считаются методом ближайшего ранга."""
+
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+
+    def test_template_settings(self):
+
+        """Кэширующий загрузчик оборачивает обычные загрузчики."""
+
+        cached = template_settings(True)[0]['OPTIONS']['loaders']
+        self.assertEqual(cached[0][0], 'django.template.loaders.cached.Loader')
+        plain = template_settings(False)[0]['OPTIONS']['loaders']
+        self.assertEqual(cached[0][1], plain)
+        call_command('run_benchmarks', requests=1, warmup=0, only=['index'],
+                     template_cache='on', stdout=StringIO())
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Запускает воркер очереди фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=None,
+            help='Размер пула процессов для задач cpu_bound '
+                 '(по умолчанию — число ядер)',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Пауза в секундах, когда очередь пуста',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться',
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(processes=options['processes'],
+                        poll_interval=options['poll_interval'])
+        try:
+            worker.run(once=options['once'])
+        except KeyboardInterrupt:
+            self.stdout.write('Воркер остановлен')
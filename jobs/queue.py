@@ -0,0 +1,59 @@
+"""Очередь фоновых задач в основной базе проекта.
+
+Задача — функция из модуля `tasks` любого приложения, помеченная
+декоратором `@task`. Представление ставит её в очередь через
+`enqueue()` и сразу отвечает, а выполняет задачу воркер
+`manage.py run_jobs`. Брокер вроде Redis не нужен.
+"""
+import json
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Job
+
+registry = {}
+
+
+class Task:
+    def __init__(self, func, cpu_bound, max_attempts):
+        self.func = func
+        self.cpu_bound = cpu_bound
+        self.max_attempts = max_attempts
+        self.name = f'{func.__module__}.{func.__qualname__}'
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, **kwargs):
+        return enqueue(self, *args, **kwargs)
+
+
+def task(func=None, *, cpu_bound=False, max_attempts=3):
+    """Зарегистрировать функцию как фоновую задачу.
+
+    `cpu_bound=True` отправляет задачу в пул процессов воркера, чтобы
+    обработка картинок и подобная работа не упиралась в GIL.
+    """
+    def register(func):
+        wrapped = Task(func, cpu_bound, max_attempts)
+        registry[wrapped.name] = wrapped
+        return wrapped
+
+    if func is not None:
+        return register(func)
+    return register
+
+
+def enqueue(task, *args, **kwargs):
+    """Поставить задачу в очередь; аргументы должны сериализоваться в JSON.
+
+    Строка задачи пишется в той же транзакции, что и данные, а при
+    JOBS_EAGER задача выполняется сразу после коммита.
+    """
+    payload = json.dumps({'args': args, 'kwargs': kwargs})
+    if getattr(settings, 'JOBS_EAGER', False):
+        transaction.on_commit(lambda: task(*args, **kwargs))
+        return None
+    return Job.objects.create(name=task.name, payload=payload,
+                              max_attempts=task.max_attempts)
@@ -0,0 +1,127 @@
+import os
+from datetime import timedelta
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import registry, task
+from jobs.worker import Worker, claim, prune, run_pending
+
+calls = []
+
+
+@task(max_attempts=2)
+def remember(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def explode():
+    raise RuntimeError('boom')
+
+
+@task(cpu_bound=True)
+def crash():
+    os._exit(1)
+
+
+@task(cpu_bound=True)
+def noop():
+    pass
+
+
+class QueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_and_run(self):
+
+        """Задача из очереди выполняется воркером с аргументами."""
+
+        job = remember.enqueue('value')
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertEqual(calls, [])
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(calls, ['value'])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+
+    def test_failed_job_is_retried_then_marked_failed(self):
+
+        """Упавшая задача повторяется до max_attempts."""
+
+        job = explode.enqueue()
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('boom', job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_claimed_job_is_not_claimed_twice(self):
+
+        """Забранную задачу не получит другой воркер, пока не истёк замок."""
+
+        remember.enqueue('once')
+        self.assertEqual(len(claim(10)), 1)
+        self.assertEqual(claim(10), [])
+        Job.objects.update(locked_until=timezone.now() - timedelta(1))
+        self.assertEqual(len(claim(10)), 1)
+
+    @override_settings(JOBS_KEEP_DONE=60)
+    def test_prune_removes_old_done_jobs(self):
+
+        """Удаляются только старые выполненные задачи."""
+
+        old = timezone.now() - timedelta(minutes=5)
+        for status in (Job.DONE, Job.DONE, Job.FAILED, Job.PENDING):
+            Job.objects.create(name='old', status=status, run_at=old)
+        fresh = Job.objects.create(name='fresh', status=Job.DONE)
+        self.assertEqual(prune(batch_size=1), 2)
+        self.assertEqual(
+            set(Job.objects.values_list('status', flat=True)),
+            {Job.FAILED, Job.PENDING, Job.DONE},
+        )
+        self.assertTrue(Job.objects.filter(pk=fresh.pk).exists())
+
+    def test_worker_survives_broken_pool(self):
+
+        """Упавший процесс не останавливает воркер: пул пересоздаётся,
+        задача уходит на повтор."""
+
+        crashed = crash.enqueue()
+        done = noop.enqueue()
+        Worker(processes=1, poll_interval=0.1).run(once=True)
+        crashed.refresh_from_db()
+        done.refresh_from_db()
+        self.assertEqual(crashed.status, Job.PENDING)
+        self.assertIn('BrokenProcessPool', crashed.last_error)
+        self.assertEqual(done.status, Job.DONE)
+
+    def test_registry_names(self):
+
+        """Задачи регистрируются по полному имени функции."""
+
+        self.assertIs(registry['jobs.tests.test_worker.remember'], remember)
+        self.assertIn('posts.tasks.build_image_variants', registry)
+
+
+class EagerQueueTest(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_mode_runs_on_commit(self):
+
+        """В режиме JOBS_EAGER задача выполняется без очереди."""
+
+        self.assertIsNone(remember.enqueue('eager'))
+        self.assertEqual(calls, ['eager'])
+        self.assertFalse(Job.objects.exists())
@@ -0,0 +1,216 @@
+import json
+import logging
+import multiprocessing
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job
+from .queue import registry
+
+logger = logging.getLogger(__name__)
+
+LOCK_TIMEOUT = timedelta(minutes=10)
+RETRY_DELAY = timedelta(seconds=30)
+PRUNE_INTERVAL = 10 * 60
+PRUNE_BATCH_SIZE = 1000
+
+
+def _init_process():
+    django.setup()
+
+
+def _run(name, payload):
+    data = json.loads(payload)
+    registry[name].func(*data['args'], **data['kwargs'])
+
+
+def _run_in_process(name, payload):
+    close_old_connections()
+    try:
+        _run(name, payload)
+    finally:
+        close_old_connections()
+
+
+def _due():
+    now = timezone.now()
+    return Job.objects.filter(
+        Q(status=Job.PENDING, run_at__lte=now)
+        | Q(status=Job.RUNNING, locked_until__lt=now)
+    )
+
+
+def claim(limit):
+    """Забрать до `limit` готовых к выполнению задач.
+
+    Условный UPDATE по статусу гарантирует, что одну задачу не заберут
+    два воркера одновременно.
+    """
+    claimed = []
+    for job in _due()[:limit * 2]:
+        locked_until = timezone.now() + LOCK_TIMEOUT
+        updated = Job.objects.filter(
+            pk=job.pk, status=job.status, locked_until=job.locked_until
+        ).update(status=Job.RUNNING, locked_until=locked_until,
+                 attempts=job.attempts + 1)
+        if updated:
+            job.status = Job.RUNNING
+            job.attempts += 1
+            claimed.append(job)
+        if len(claimed) == limit:
+            break
+    return claimed
+
+
+def finish(job, error=None):
+    if error is None:
+        job.status = Job.DONE
+        job.last_error = ''
+    elif job.attempts < job.max_attempts:
+        job.status = Job.PENDING
+        job.run_at = timezone.now() + RETRY_DELAY * 2 ** (job.attempts - 1)
+        job.last_error = error
+    else:
+        job.status = Job.FAILED
+        job.last_error = error
+    job.locked_until = None
+    job.save(update_fields=['status', 'run_at', 'locked_until',
+                            'last_error'])
+    if error is not None:
+        logger.warning('Задача %s #%s: попытка %s из %s не удалась\n%s',
+                       job.name, job.pk, job.attempts, job.max_attempts,
+                       error)
+
+
+def run_job(job):
+    if job.name not in registry:
+        finish(job, f'Неизвестная задача {job.name}')
+        return
+    try:
+        _run(job.name, job.payload)
+    except Exception:
+        finish(job, traceback.format_exc())
+    else:
+        finish(job)
+
+
+def prune(batch_size=PRUNE_BATCH_SIZE):
+    """Удалить выполненные задачи старше JOBS_KEEP_DONE секунд пачками;
+    вернуть их число. Упавшие задачи остаются для разбора."""
+    keep = timedelta(seconds=getattr(settings, 'JOBS_KEEP_DONE',
+                                     24 * 60 * 60))
+    old = Job.objects.filter(status=Job.DONE,
+                             run_at__lt=timezone.now() - keep)
+    deleted = 0
+    while True:
+        ids = list(old.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += Job.objects.filter(pk__in=ids).delete()[0]
+
+
+def run_pending(limit=100):
+    """Выполнить готовые задачи в текущем процессе; вернуть их число."""
+    done = 0
+    while done < limit:
+        jobs = claim(min(10, limit - done))
+        if not jobs:
+            return done
+        for job in jobs:
+            run_job(job)
+        done += len(jobs)
+    return done
+
+
+class Worker:
+    """Цикл воркера: задачи ввода-вывода выполняются в основном процессе,
+    `cpu_bound` — в пуле из `processes` процессов.
+
+    Раз в PRUNE_INTERVAL секунд цикл удаляет старые выполненные задачи.
+    Пул, сломанный упавшим процессом, пересоздаётся: задачи из него
+    уходят на повтор, а цикл продолжает работу."""
+
+    def __init__(self, processes=None, poll_interval=1.0):
+        self.processes = processes or multiprocessing.cpu_count()
+        self.poll_interval = poll_interval
+        self.futures = {}
+        self.pool = None
+        self.pruned_at = None
+
+    def _start_pool(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False)
+        self.pool = ProcessPoolExecutor(self.processes,
+                                        initializer=_init_process)
+
+    def _restart_pool(self):
+        logger.warning('Пул процессов сломан, создаём новый')
+        self._start_pool()
+
+    def _submit(self, job):
+        try:
+            future = self.pool.submit(_run_in_process, job.name,
+                                      job.payload)
+        except BrokenProcessPool:
+            self._restart_pool()
+            future = self.pool.submit(_run_in_process, job.name,
+                                      job.payload)
+        self.futures[future] = job
+
+    def _collect(self, timeout=0):
+        if not self.futures:
+            return
+        done, _ = wait(self.futures, timeout=timeout,
+                       return_when=FIRST_COMPLETED)
+        broken = False
+        for future in done:
+            job = self.futures.pop(future)
+            error = future.exception()
+            broken = broken or isinstance(error, BrokenProcessPool)
+            finish(job, None if error is None else ''.join(
+                traceback.format_exception(type(error), error,
+                                           error.__traceback__)))
+        if broken:
+            self._restart_pool()
+
+    def _prune(self):
+        now = time.monotonic()
+        if self.pruned_at is None or now - self.pruned_at >= PRUNE_INTERVAL:
+            self.pruned_at = now
+            prune()
+
+    def run(self, once=False):
+        connections.close_all()
+        self._start_pool()
+        try:
+            while True:
+                self._prune()
+                self._collect()
+                free = self.processes - len(self.futures)
+                jobs = claim(free) if free > 0 else []
+                for job in jobs:
+                    task = registry.get(job.name)
+                    if task is not None and task.cpu_bound:
+                        self._submit(job)
+                    else:
+                        run_job(job)
+                if jobs:
+                    continue
+                if once and not self.futures:
+                    return
+                if self.futures:
+                    self._collect(timeout=self.poll_interval)
+                else:
+                    time.sleep(self.poll_interval)
+        finally:
+            self.pool.shutdown()
+            self.pool = None
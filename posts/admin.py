@@ -1,18 +1,51 @@
 from django.contrib import admin
 
+from . import chunked, moderation, search
 from .models import Comment, Group, Post
 
 
+class BatchDeleteMixin:
+    """Удаление выбранного пачками вместо delete_selected, который
+    загружает и показывает на подтверждении все объекты разом."""
+
+    delete_batch_size = 100
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def delete_in_batches(self, request, queryset):
+        deleted = self.delete_queryset_in_batches(queryset)
+        self.message_user(request, f'Удалено: {deleted}')
+
+    delete_in_batches.short_description = 'Удалить выбранные (пачками)'
+    delete_in_batches.allowed_permissions = ('delete',)
+
+    def delete_queryset_in_batches(self, queryset):
+        return chunked.delete(queryset, self.delete_batch_size)
+
+
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(BatchDeleteMixin, admin.ModelAdmin):
 
     list_display = ("text", "pub_date", "author")
+    list_select_related = ("author",)
+    # COUNT(*) по всей таблице на каждой странице списка не нужен
+    show_full_result_count = False
+    actions = ["delete_in_batches"]
 
     search_fields = ("text",)
 
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        ids = search.ranked_ids(search_term)
+        return queryset.filter(pk__in=ids), False
+
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
@@ -22,11 +55,19 @@ class GroupAdmin(admin.ModelAdmin):
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(BatchDeleteMixin, admin.ModelAdmin):
     list_display = ('author', 'text', 'post', 'created', 'active')
     list_filter = ('active', 'created')
+    list_select_related = ('author', 'post')
+    # тот же порядок, что у частичных индексов comment_*_idx
+    ordering = ('created', 'id')
     search_fields = ('author', 'text')
-    actions = ['approve_comments']
+    show_full_result_count = False
+    actions = ['approve_comments', 'delete_in_batches']
 
     def approve_comments(self, request, queryset):  # noqa
-        queryset.update(active=True)
+        approved = moderation.approve(queryset)
+        self.message_user(request, f'Одобрено: {approved}')
+
+    def delete_queryset_in_batches(self, queryset):
+        return moderation.delete(queryset)
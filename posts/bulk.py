@@ -0,0 +1,160 @@
+"""Потоковый импорт и экспорт данных в JSON Lines и CSV.
+
+В отличие от `dumpdata`/`loaddata` строки не собираются в памяти:
+экспорт читает таблицу пачками по первичному ключу, импорт пишет
+пачками по `batch_size` через `insert` (`bulk_create` без подмены
+дат), каждая пачка — в своей транзакции. Сигналы при этом не срабатывают, поэтому счётчики, ленты
+и поисковый индекс после импорта пересчитываются целиком (`rebuild`).
+"""
+import csv
+import itertools
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import AutoField
+
+from . import chunked, feed_cache
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+FORMATS = ('jsonl', 'csv')
+
+KINDS = {
+    'users': (User, ('id', 'username', 'email', 'first_name', 'last_name',
+                     'password', 'is_staff', 'is_active', 'date_joined')),
+    'groups': (Group, ('id', 'title', 'slug', 'description')),
+    'posts': (Post, ('id', 'author_id', 'group_id', 'text', 'pub_date',
+                     'image')),
+    'comments': (Comment, ('id', 'post_id', 'author_id', 'text', 'created',
+                           'active')),
+    'follows': (Follow, ('id', 'user_id', 'author_id')),
+}
+# порядок, в котором данные нужно загружать из-за внешних ключей
+ORDER = ('users', 'groups', 'posts', 'comments', 'follows')
+
+
+def insert(model, objects, ignore_conflicts=False):
+    """`bulk_create` со значениями полей как есть.
+
+    Поля с auto_now_add (`pub_date`, `created`) не подменяются текущим
+    временем: строки вставляются в режиме raw, как у `loaddata`, а
+    метаданные модели, общие для всех потоков, не меняются.
+    """
+    objects = list(objects)
+    manager = model._base_manager
+    fields = model._meta.concrete_fields
+    with_pk = [obj for obj in objects if obj.pk is not None]
+    without_pk = [obj for obj in objects if obj.pk is None]
+    with transaction.atomic(using=manager.db, savepoint=False):
+        for batch, columns in (
+            (with_pk, fields),
+            (without_pk, [field for field in fields
+                          if not isinstance(field, AutoField)]),
+        ):
+            size = connection.ops.bulk_batch_size(columns, batch) or 1
+            for start in range(0, len(batch), size):
+                manager._insert(batch[start:start + size], fields=columns,
+                                raw=True, ignore_conflicts=ignore_conflicts)
+    for obj in objects:
+        obj._state.adding = False
+        obj._state.db = manager.db
+    return objects
+
+
+def guess_format(path):
+    return 'csv' if str(path).endswith('.csv') else 'jsonl'
+
+
+def _encode(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def rows(kind, batch_size=BATCH_SIZE):
+    """Строки таблицы словарями, пачками по первичному ключу."""
+    model, fields = KINDS[kind]
+    for values in chunked.rows(model.objects.values_list(*fields),
+                               batch_size):
+        yield dict(zip(fields, map(_encode, values)))
+
+
+def write(kind, stream, fmt='jsonl', batch_size=BATCH_SIZE):
+    """Выгрузить таблицу в поток; вернуть число строк."""
+    _, fields = KINDS[kind]
+    count = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=fields)
+        writer.writeheader()
+        for count, row in enumerate(rows(kind, batch_size), 1):
+            writer.writerow(row)
+        return count
+    for count, row in enumerate(rows(kind, batch_size), 1):
+        stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+    return count
+
+
+def read(stream, fmt='jsonl'):
+    """Строки из потока словарями."""
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _builder(kind):
+    model, fields = KINDS[kind]
+    model_fields = {name: model._meta.get_field(name) for name in fields}
+
+    def build(row):
+        values = {}
+        for name, field in model_fields.items():
+            if name not in row:
+                continue
+            value = row[name]
+            if value == '' and field.null:
+                value = None
+            values[name] = field.to_python(value)
+        return model(**values)
+
+    return build
+
+
+def load(kind, records, batch_size=BATCH_SIZE, ignore_conflicts=False):
+    """Загрузить строки пачками; вернуть число обработанных строк."""
+    model, _ = KINDS[kind]
+    build = _builder(kind)
+    objects = map(build, records)
+    count = 0
+    while True:
+        batch = list(itertools.islice(objects, batch_size))
+        if not batch:
+            break
+        with transaction.atomic():
+            insert(model, batch, ignore_conflicts=ignore_conflicts)
+        count += len(batch)
+    _reset_sequence(model)
+    return count
+
+
+def _reset_sequence(model):
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def rebuild(stdout=None):
+    """Пересчитать всё, что при обычном сохранении делают сигналы."""
+    for command in ('recount_stats', 'rebuild_timelines',
+                    'rebuild_search_index'):
+        call_command(command, stdout=stdout)
+    feed_cache.everything_changed()
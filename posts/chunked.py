@@ -0,0 +1,87 @@
+"""Обработка больших выборок пачками по первичному ключу.
+
+`update()` или `delete()` по всей выборке — одна долгая транзакция,
+которая держит блокировки, пока сайт ждёт, а обход через `iterator()`
+держит курсор открытым всё время обработки. Здесь выборка проходится
+по возрастанию pk пачками по `batch_size` (keyset, без OFFSET): каждая
+пачка — отдельный короткий запрос и, если пачка меняет данные,
+отдельная транзакция. Память ограничена размером пачки, а запись
+с сайта ждёт не дольше одной пачки.
+"""
+import time
+
+from django.db import transaction
+
+BATCH_SIZE = 1000
+
+
+def pk_batches(queryset, batch_size=BATCH_SIZE):
+    """Списки pk выборки по возрастанию, по `batch_size` в каждом."""
+    ids = queryset.order_by('pk').values_list('pk', flat=True)
+    last = None
+    while True:
+        batch = ids if last is None else ids.filter(pk__gt=last)
+        batch = list(batch[:batch_size])
+        if batch:
+            yield batch
+        if len(batch) < batch_size:
+            return
+        last = batch[-1]
+
+
+def row_batches(queryset, batch_size=BATCH_SIZE):
+    """Списки строк `values_list`, первое поле которого — pk."""
+    queryset = queryset.order_by('pk')
+    last = None
+    while True:
+        batch = queryset if last is None else queryset.filter(pk__gt=last)
+        batch = list(batch[:batch_size])
+        if batch:
+            yield batch
+        if len(batch) < batch_size:
+            return
+        last = batch[-1][0]
+
+
+def rows(queryset, batch_size=BATCH_SIZE):
+    """Строки `values_list`, первое поле которого — pk, по одному
+    запросу на пачку."""
+    for batch in row_batches(queryset, batch_size):
+        yield from batch
+
+
+def objects(queryset, batch_size=BATCH_SIZE):
+    """Объекты выборки пачками, без курсора на всю выборку."""
+    queryset = queryset.order_by('pk')
+    last = None
+    while True:
+        batch = queryset if last is None else queryset.filter(pk__gt=last)
+        batch = list(batch[:batch_size])
+        yield from batch
+        if len(batch) < batch_size:
+            return
+        last = batch[-1].pk
+
+
+def process(queryset, action, batch_size=BATCH_SIZE, pause=0):
+    """Вызвать `action` для каждой пачки в отдельной транзакции.
+
+    `action` получает выборку строк пачки (`filter(pk__in=...)`).
+    `pause` — сколько секунд дать сайту между пачками. Возвращает
+    число обработанных строк.
+    """
+    manager = queryset.model._base_manager
+    total = 0
+    for batch in pk_batches(queryset, batch_size):
+        with transaction.atomic(using=queryset.db):
+            action(manager.using(queryset.db).filter(pk__in=batch))
+        total += len(batch)
+        if pause:
+            time.sleep(pause)
+    return total
+
+
+def delete(queryset, batch_size=BATCH_SIZE, pause=0):
+    """Удалить выборку пачками; сигналы и каскады — как у `delete()`."""
+    return process(queryset, lambda batch: batch.delete(), batch_size,
+                   pause)
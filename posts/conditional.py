@@ -0,0 +1,42 @@
+"""Условные GET-запросы для лент и страницы поста.
+
+ETag собирается из того, что уже известно до рендера: id и версий
+карточек на странице, курсоров и данных шапки. Если клиент прислал
+тот же ETag в If-None-Match, отвечаем 304 без рендера шаблона.
+Last-Modified не отдаётся: у поста нет времени изменения, и
+правка текста не сдвигает pub_date.
+"""
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control, patch_vary_headers)
+from django.utils.http import quote_etag
+
+
+def make_etag(request, *parts):
+    """ETag для страницы, которая зависит от `parts` и пользователя."""
+    user = request.user.pk if request.user.is_authenticated else None
+    raw = repr((getattr(settings, 'RELEASE', ''), user) + parts)
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def page_etag(request, page, *parts):
+    """ETag для страницы ленты с карточками постов."""
+    cards = [(post.pk, post.card_version) for post in page.object_list]
+    return make_etag(request, cards, page.has_next(), page.has_previous(),
+                     *parts)
+
+
+def respond(request, etag, render):
+    """304 при совпадении ETag, иначе результат `render()`."""
+    response = None
+    if request.method in ('GET', 'HEAD'):
+        response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = render()
+    response['ETag'] = etag
+    # страница разная для гостей и каждого пользователя
+    patch_vary_headers(response, ('Cookie',))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -1,8 +1,16 @@
 import datetime as dt
 
+from django.conf import settings
+
 
 def year(request):  # noqa
     date = dt.datetime.today().year
     return {
         'year': date
     }
+
+
+def feed_cache_ttl(request):  # noqa
+    return {
+        'feed_cache_ttl': settings.FEED_CACHE_TTL
+    }
@@ -0,0 +1,119 @@
+"""Денормализованные счётчики постов, подписок, комментариев и групп.
+
+Сигналы сдвигают счётчики через `F()`, не пересчитывая их. Строка
+`UserStats` создаётся вместе с пользователем (сигнал `post_save`), чтение
+ничего не пишет: если строки всё же нет (пользователи загружены в обход
+сигналов), счётчики считаются по данным, а строку создаст recount_stats.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import (Count, DateTimeField, F, IntegerField,
+                              OuterRef, Subquery)
+from django.db.models.functions import Coalesce, Greatest
+
+from . import chunked
+from .models import Comment, Follow, Group, GroupStats, Post, UserStats
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+
+
+def bump_user(user_id, field, delta):
+    UserStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta}
+    )
+
+
+def bump_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=F('comment_count') + delta
+    )
+
+
+def bump_group(group_id, delta, pub_date=None):
+    """Сдвинуть число постов группы; при добавлении поста — и время
+    последней активности, при удалении — пересчитать его по индексу."""
+    if pub_date is not None:
+        activity = Greatest(Coalesce('last_activity', pub_date), pub_date)
+    else:
+        activity = _latest()
+    GroupStats.objects.filter(group_id=group_id).update(
+        post_count=F('post_count') + delta, last_activity=activity
+    )
+
+
+def _latest():
+    rows = Post.objects.filter(
+        group=OuterRef('group_id')
+    ).order_by('-pub_date').values('pub_date')[:1]
+    return Subquery(rows, output_field=DateTimeField())
+
+
+def recount_groups():
+    """Пересчитать GroupStats всех групп; вернуть число групп."""
+    with transaction.atomic():
+        GroupStats.objects.all().delete()
+        GroupStats.objects.bulk_create(
+            GroupStats(group_id=pk, post_count=total)
+            for pk, total in Group.objects.annotate(
+                total=_count(Post, 'group')
+            ).values_list('pk', 'total').iterator()
+        )
+        GroupStats.objects.update(last_activity=_latest())
+    return GroupStats.objects.count()
+
+
+def _count(model, field, **filters):
+    rows = model.objects.filter(
+        **{field: OuterRef('pk')}, **filters
+    ).order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def _user_counts(queryset):
+    return queryset.annotate(
+        posts_total=_count(Post, 'author'),
+        followers_total=_count(Follow, 'author'),
+        following_total=_count(Follow, 'user'),
+    ).values_list('pk', 'posts_total', 'followers_total', 'following_total')
+
+
+def _stats(rows):
+    return [
+        UserStats(user_id=pk, posts_count=posts,
+                  followers_count=followers, following_count=following)
+        for pk, posts, followers, following in rows
+    ]
+
+
+def stats_for(user):
+    """Счётчики пользователя; без строки — посчитанные по данным."""
+    try:
+        return UserStats.objects.get(user=user)
+    except UserStats.DoesNotExist:
+        stats, = _stats(_user_counts(User.objects.filter(pk=user.pk)))
+        return stats
+
+
+def create_stats(user_id):
+    """Пустая строка счётчиков для нового пользователя."""
+    UserStats.objects.bulk_create([UserStats(user_id=user_id)],
+                                  ignore_conflicts=True)
+
+
+def recount_comments():
+    """Пересчитать comment_count (одобренные комментарии) всех постов
+    одним UPDATE."""
+    return Post.objects.update(
+        comment_count=_count(Comment, 'post', active=True)
+    )
+
+
+def recount_users(batch_size=BATCH_SIZE):
+    """Пересчитать UserStats всех пользователей пачками."""
+    def recount(users):
+        UserStats.objects.filter(user__in=users).delete()
+        UserStats.objects.bulk_create(_stats(_user_counts(users)))
+
+    return chunked.process(User.objects.all(), recount, batch_size)
@@ -0,0 +1,109 @@
+"""Версионированный кэш страниц ленты и карточек постов.
+
+Ключи не удаляются, а устаревают: в каждый ключ входит номер версии,
+который увеличивается при изменении поста, комментария или группы.
+Так TTL можно держать в часах, а изменения видны сразу.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from yatube import db_router
+from .paginator import CursorPage
+
+GLOBAL = 'all'
+
+
+def _ttl():
+    return getattr(settings, 'FEED_CACHE_TTL', 60 * 60)
+
+
+def _version_key(name):
+    return f'version:{name}'
+
+
+def _initial_version():
+    # версия, вытесненная из кэша, начинается заново с текущего времени,
+    # а не с единицы, чтобы не совпасть с одной из прошлых версий
+    return int(time.time() * 1000)
+
+
+def versions(*names):
+    """Текущие версии для набора имён одним обращением к кэшу."""
+    keys = {_version_key(name): name for name in (GLOBAL,) + names}
+    found = cache.get_many(keys)
+    missing = {key: _initial_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {keys[key]: value for key, value in found.items()}
+
+
+def bump(*names):
+    for name in names:
+        key = _version_key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+
+
+def index_feed():
+    return 'feed:index'
+
+
+def group_feed(group_id):
+    return f'feed:group:{group_id}'
+
+
+def profile_feed(author_id):
+    return f'feed:profile:{author_id}'
+
+
+def get_page(feed, paginator, cursor):
+    """Страница ленты из кэша; при промахе — из базы с записью в кэш."""
+    version = versions(feed)
+    token = hashlib.md5(str(cursor or '').encode()).hexdigest()
+    key = f'page:{feed}:{version[GLOBAL]}.{version[feed]}:{token}'
+    cached = cache.get(key)
+    if cached is not None:
+        rows, has_next, has_previous = cached
+        return CursorPage(rows, paginator, has_next, has_previous, cursor)
+    with db_router.primary_reads():
+        page = paginator.get_page(cursor)
+    cache.set(key, (page.rows, page.has_next(), page.has_previous()),
+              _ttl())
+    return page
+
+
+def attach_versions(posts):
+    """Проставить постам `card_version` для ключа фрагмента карточки."""
+    names = set()
+    for post in posts:
+        names.add(f'post:{post.pk}')
+        if post.group_id is not None:
+            names.add(f'group:{post.group_id}')
+    current = versions(*names)
+    for post in posts:
+        parts = [current[GLOBAL], current[f'post:{post.pk}']]
+        if post.group_id is not None:
+            parts.append(current[f'group:{post.group_id}'])
+        post.card_version = '.'.join(map(str, parts))
+    return posts
+
+
+def post_changed(post_id, author_id, *group_ids):
+    names = {f'post:{post_id}', index_feed(), profile_feed(author_id)}
+    names.update(group_feed(group_id) for group_id in group_ids
+                 if group_id is not None)
+    bump(*names)
+
+
+def group_changed(group_id):
+    bump(f'group:{group_id}', group_feed(group_id))
+
+
+def everything_changed():
+    bump(GLOBAL)
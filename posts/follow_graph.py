@@ -0,0 +1,113 @@
+"""Граф подписок: на кого подписан пользователь.
+
+Подписки пользователя — отсортированный массив id авторов
+(`array('q')`). В общем кэше он лежит байтами под версией
+`follows:<id>`, в памяти процесса — готовым массивом, сверенным с той
+же версией. «Подписан ли A на B» — двоичный поиск, число подписок —
+длина массива, проверка целой страницы авторов — один массив на всех.
+
+Версию поднимает любая запись `Follow`: сигналы и пакетный перенос
+`write_behind`. Импорт данных поднимает общую версию
+`feed_cache.GLOBAL` и этим сбрасывает весь граф. Число подписчиков
+берётся из `UserStats`: обратные списки популярных авторов слишком
+длинны, чтобы держать их в кэше целиком.
+"""
+import bisect
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from yatube import db_router
+from . import feed_cache
+from .models import Follow
+
+TYPECODE = 'q'
+MAX_CACHED = 10000
+
+_following = {}
+
+
+def _ttl():
+    return getattr(settings, 'FEED_CACHE_TTL', 60 * 60)
+
+
+def _name(user_id):
+    return f'follows:{user_id}'
+
+
+def _version(user_id):
+    name = _name(user_id)
+    current = feed_cache.versions(name)
+    return f'{current[feed_cache.GLOBAL]}.{current[name]}'
+
+
+def _load(user_id):
+    with db_router.primary_reads():
+        return array(TYPECODE, Follow.objects.filter(
+            user_id=user_id
+        ).order_by('author_id').values_list('author_id', flat=True))
+
+
+def _ids(user_id):
+    if user_id is None:
+        return array(TYPECODE)
+    version = _version(user_id)
+    cached = _following.get(user_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    key = f'follow_graph:{version}:{user_id}'
+    raw = cache.get(key)
+    if raw is None:
+        ids = _load(user_id)
+        cache.set(key, ids.tobytes(), _ttl())
+    else:
+        ids = array(TYPECODE)
+        ids.frombytes(raw)
+    if len(_following) >= MAX_CACHED:
+        _following.clear()
+    _following[user_id] = (version, ids)
+    return ids
+
+
+def following_ids(user):
+    """Отсортированный массив id авторов, на которых подписан `user`."""
+    return _ids(user.pk if user.is_authenticated else None)
+
+
+def following_count(user):
+    return len(following_ids(user))
+
+
+def _contains(ids, author_id):
+    position = bisect.bisect_left(ids, author_id)
+    return position < len(ids) and ids[position] == author_id
+
+
+def follows(user, author):
+    """Подписан ли `user` на `author`."""
+    return _contains(following_ids(user), author.pk)
+
+
+def followed_among(user, author_ids):
+    """Те из `author_ids`, на кого подписан `user`, — для целой
+    страницы авторов одним массивом."""
+    ids = following_ids(user)
+    return {author_id for author_id in author_ids
+            if _contains(ids, author_id)}
+
+
+def changed(*user_ids):
+    """Подписки пользователей изменились.
+
+    Версия поднимается сразу и ещё раз после коммита: иначе читатель,
+    успевший прочитать подписки до коммита, сохранил бы их под новой
+    версией.
+    """
+    def bump():
+        for user_id in user_ids:
+            _following.pop(user_id, None)
+        feed_cache.bump(*(_name(user_id) for user_id in user_ids))
+    bump()
+    transaction.on_commit(bump)
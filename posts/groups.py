@@ -0,0 +1,109 @@
+"""Каталог групп и кэш групп по slug.
+
+Страница группы — второй по посещаемости адрес, поэтому группа по slug
+берётся из словаря в памяти процесса, а не из базы. Словарь сверяется
+с версией `group_slugs` в общем кэше, которую поднимает любой процесс
+только при сохранении или удалении группы. Каталог с числом постов
+и временем последнего поста (`GroupStats`) кэшируется под версией
+`groups`, число постов группы — под версией `group_posts:<id>`: их
+поднимают и записи постов в группе, не трогая кэш по slug.
+
+Первая страница группы лежит в `feed_cache` и после записи поста
+строится заново сразу после коммита, а не первым читателем.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.http import Http404
+
+from yatube import db_router
+from . import feed_cache
+from .models import Group, GroupStats
+from .paginator import CursorPaginator
+
+SLUGS = 'group_slugs'
+DIRECTORY = 'groups'
+MAX_CACHED = 1000
+
+_by_slug = {}
+
+
+def _ttl():
+    return getattr(settings, 'FEED_CACHE_TTL', 60 * 60)
+
+
+def _posts_name(group_id):
+    return f'group_posts:{group_id}'
+
+
+def _version(name):
+    current = feed_cache.versions(name)
+    return f'{current[feed_cache.GLOBAL]}.{current[name]}'
+
+
+def by_slug(slug):
+    """Группа по slug или Http404."""
+    version = _version(SLUGS)
+    cached = _by_slug.get(slug)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with db_router.primary_reads():
+        group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        raise Http404('Группа не найдена')
+    if len(_by_slug) >= MAX_CACHED:
+        _by_slug.clear()
+    _by_slug[slug] = (version, group)
+    return group
+
+
+def directory():
+    """Группы со счётчиками, сначала те, где писали последними."""
+    key = f'directory:{_version(DIRECTORY)}'
+    rows = cache.get(key)
+    if rows is None:
+        with db_router.primary_reads():
+            rows = list(GroupStats.objects.select_related('group').order_by(
+                F('last_activity').desc(nulls_last=True), 'group__title'
+            ))
+        cache.set(key, rows, _ttl())
+    return rows
+
+
+def post_count(group):
+    key = f'group_count:{_version(_posts_name(group.pk))}:{group.pk}'
+    count = cache.get(key)
+    if count is None:
+        with db_router.primary_reads():
+            count = GroupStats.objects.filter(group=group).values_list(
+                'post_count', flat=True
+            ).first() or 0
+        cache.set(key, count, _ttl())
+    return count
+
+
+def paginator(group):
+    return CursorPaginator(group.posts.for_feed(),
+                           settings.PAGINATOR_PAGE_SIZE)
+
+
+def warm(group_id):
+    """Построить первую страницу группы после коммита записи."""
+    def build():
+        group = Group.objects.filter(pk=group_id).first()
+        if group is not None:
+            feed_cache.get_page(feed_cache.group_feed(group_id),
+                                paginator(group), None)
+    transaction.on_commit(build)
+
+
+def changed():
+    """Группу сохранили или удалили."""
+    _by_slug.clear()
+    feed_cache.bump(SLUGS, DIRECTORY)
+
+
+def posts_changed(*group_ids):
+    """Изменилось число постов групп: сбросить каталог и их счётчики."""
+    feed_cache.bump(DIRECTORY, *map(_posts_name, group_ids))
@@ -0,0 +1,117 @@
+"""Уменьшенные копии картинок постов, готовые к моменту показа.
+
+Копии строятся один раз при сохранении картинки, их адреса пишутся в
+`Post.image_variants`, и шаблон выводит `srcset` без обращений к
+sorl-thumbnail и его хранилищу ключей.
+"""
+import base64
+import io
+import json
+import logging
+import os
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageFilter, ImageOps, features
+
+from . import feed_cache
+
+logger = logging.getLogger(__name__)
+
+ASPECT = (960, 339)
+WIDTHS = (480, 960, 1440)
+PLACEHOLDER_WIDTH = 24
+QUALITY = 82
+
+
+def _height(width):
+    return round(width * ASPECT[1] / ASPECT[0])
+
+
+def _encode(image, fmt):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, quality=QUALITY, optimize=fmt == 'JPEG')
+    return buffer.getvalue()
+
+
+def _placeholder(image):
+    size = (PLACEHOLDER_WIDTH, _height(PLACEHOLDER_WIDTH))
+    small = ImageOps.fit(image, size, Image.BILINEAR)
+    data = _encode(small.filter(ImageFilter.GaussianBlur(1)), 'JPEG')
+    return 'data:image/jpeg;base64,' + base64.b64encode(data).decode()
+
+
+def _formats():
+    formats = [('jpeg', 'JPEG', 'jpg')]
+    if features.check('webp'):
+        formats.append(('webp', 'WEBP', 'webp'))
+    return formats
+
+
+def _directory(post):
+    return f'posts/variants/{post.pk}'
+
+
+def _remove_stale(post, keep):
+    """Удалить файлы копий поста, кроме `keep` (копий новой картинки)."""
+    directory = _directory(post)
+    try:
+        _, files = default_storage.listdir(directory)
+    except (OSError, SuspiciousFileOperation):
+        return
+    for name in files:
+        path = f'{directory}/{name}'
+        if path not in keep:
+            default_storage.delete(path)
+
+
+def render_variants(post, saved=None):
+    """Построить копии картинки поста и вернуть их описание.
+
+    Имена сохранённых файлов добавляются в множество `saved`.
+    """
+    stem = os.path.splitext(os.path.basename(post.image.name))[0]
+    directory = _directory(post)
+    with post.image.open('rb') as source:
+        image = Image.open(source)
+        image.load()
+    image = ImageOps.exif_transpose(image).convert('RGB')
+
+    variants = {'placeholder': _placeholder(image)}
+    for key, fmt, extension in _formats():
+        srcset = []
+        for width in WIDTHS:
+            resized = ImageOps.fit(image, (width, _height(width)),
+                                   Image.LANCZOS)
+            name = default_storage.save(
+                f'{directory}/{stem}-{width}.{extension}',
+                ContentFile(_encode(resized, fmt)),
+            )
+            if saved is not None:
+                saved.add(name)
+            srcset.append(f'{default_storage.url(name)} {width}w')
+            if key == 'jpeg' and width == ASPECT[0]:
+                variants['src'] = default_storage.url(name)
+        variants[f'{key}_srcset'] = ', '.join(srcset)
+    return variants
+
+
+def build_variants(post):
+    """Сохранить в посте копии его картинки (или очистить их) и удалить
+    файлы копий прежней картинки."""
+    variants = {}
+    saved = set()
+    if post.image:
+        try:
+            variants = render_variants(post, saved)
+        except (OSError, ValueError):
+            logger.exception('Не удалось обработать картинку поста %s',
+                             post.pk)
+    post.image_variants = json.dumps(variants) if variants else ''
+    type(post).objects.filter(pk=post.pk).update(
+        image_variants=post.image_variants
+    )
+    _remove_stale(post, saved if variants else set())
+    feed_cache.post_changed(post.pk, post.author_id, post.group_id)
+    return variants
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import chunked, images
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Строит уменьшенные копии картинок постов, у которых их нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Перестроить копии и у постов, где они уже есть',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').exclude(image=None)
+        if not options['all']:
+            posts = posts.filter(image_variants='')
+        built = 0
+        for post in chunked.objects(posts, batch_size=100):
+            if images.build_variants(post):
+                built += 1
+        self.stdout.write(self.style.SUCCESS(f'Обработано постов: {built}'))
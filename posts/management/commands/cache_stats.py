@@ -0,0 +1,18 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Показывает статистику общего кэша'
+
+    def handle(self, *args, **options):
+        if not hasattr(cache, 'stats'):
+            raise CommandError(
+                'Статистику ведёт только кэш SQLiteCache (YATUBE_CACHE=sqlite)'
+            )
+        stats = cache.stats()
+        requests = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / requests if requests else 0
+        for name, value in sorted(stats.items()):
+            self.stdout.write(f'{name}: {value}')
+        self.stdout.write(f'hit_ratio: {ratio:.2%}')
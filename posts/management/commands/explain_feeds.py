@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts import query_plans
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Выполняет EXPLAIN для запросов лент и падает, если какой-то '
+            'из них просматривает таблицу целиком или сортирует результат')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in query_plans.PROBLEMS:
+            raise CommandError(
+                f'Планы для {connection.vendor} не поддерживаются'
+            )
+        post = Post.objects.exclude(group=None).first()
+        if post is None:
+            raise CommandError('Нужен хотя бы один пост с группой')
+
+        failed = []
+        for name, plan, problems in query_plans.check(post):
+            if problems:
+                failed.append(name)
+            if problems or options['verbosity'] > 1:
+                self.stdout.write(f'== {name}\n{plan}')
+        if failed:
+            raise CommandError(
+                'Запросы без подходящего индекса: ' + ', '.join(failed)
+            )
+        self.stdout.write(
+            self.style.SUCCESS('Все запросы лент идут по индексам')
+        )
@@ -0,0 +1,33 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import bulk
+
+
+class Command(BaseCommand):
+    help = 'Выгружает таблицу в JSON Lines или CSV, не загружая её в память'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=bulk.ORDER)
+        parser.add_argument('path', help='Файл или «-» для stdout')
+        parser.add_argument(
+            '--format', choices=bulk.FORMATS,
+            help='По умолчанию определяется по расширению файла',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=bulk.BATCH_SIZE,
+            help='Сколько строк читать из базы за один запрос',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or bulk.guess_format(path)
+        if path == '-':
+            bulk.write(options['kind'], sys.stdout, fmt,
+                       options['batch_size'])
+            return
+        with open(path, 'w', encoding='utf-8', newline='') as stream:
+            count = bulk.write(options['kind'], stream, fmt,
+                               options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Выгружено строк: {count}'))
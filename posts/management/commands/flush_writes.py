@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from posts import write_behind
+
+
+class Command(BaseCommand):
+    help = ('Переносит отложенные подписки и комментарии из локального '
+            'буфера в базу; запускается на каждом веб-сервере')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=write_behind.BATCH_SIZE)
+        parser.add_argument(
+            '--interval', type=float, default=None,
+            help='Пауза в секундах, когда буфер пуст '
+                 '(по умолчанию WRITE_BEHIND_INTERVAL)',
+        )
+        parser.add_argument('--once', action='store_true',
+                            help='Перенести всё накопленное и завершиться')
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        if interval is None:
+            interval = settings.WRITE_BEHIND_INTERVAL
+        total = 0
+        try:
+            while True:
+                flushed = write_behind.flush(options['batch_size'])
+                total += flushed
+                if flushed:
+                    continue
+                if options['once']:
+                    break
+                close_old_connections()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f'Перенесено действий: {total}')
@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from posts import bulk
+
+
+class Command(BaseCommand):
+    help = ('Загружает таблицу из JSON Lines или CSV пачками через '
+            'bulk_create. Порядок загрузки: ' + ', '.join(bulk.ORDER))
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=bulk.ORDER)
+        parser.add_argument('path', help='Файл или «-» для stdin')
+        parser.add_argument(
+            '--format', choices=bulk.FORMATS,
+            help='По умолчанию определяется по расширению файла',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=bulk.BATCH_SIZE,
+            help='Сколько строк вставлять в одной транзакции',
+        )
+        parser.add_argument(
+            '--ignore-conflicts', action='store_true',
+            help='Пропускать строки, которые уже есть в базе',
+        )
+        parser.add_argument(
+            '--no-rebuild', action='store_true',
+            help='Не пересчитывать счётчики, ленты и поисковый индекс '
+                 '(удобно, если дальше грузятся другие таблицы)',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or bulk.guess_format(path)
+        stream = (sys.stdin if path == '-'
+                  else open(path, encoding='utf-8', newline=''))
+        try:
+            count = bulk.load(options['kind'], bulk.read(stream, fmt),
+                              options['batch_size'],
+                              options['ignore_conflicts'])
+        except IntegrityError as error:
+            raise CommandError(f'Не удалось загрузить пачку: {error}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        if not options['no_rebuild']:
+            bulk.rebuild(self.stdout)
+        self.stdout.write(self.style.SUCCESS(f'Загружено строк: {count}'))
@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts import chunked, timeline
+from posts.models import Follow, TimelineEntry
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Заполняет ленты подписок заново и обрезает их до TIMELINE_LENGTH'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--trim-only', action='store_true',
+            help='Только обрезать существующие ленты',
+        )
+
+    def handle(self, *args, **options):
+        if options['trim_only']:
+            users = User.objects.filter(
+                pk__in=TimelineEntry.objects.values('user_id')
+            )
+            for batch in chunked.pk_batches(users, timeline.USER_BATCH_SIZE):
+                timeline.trim(*batch)
+        else:
+            chunked.delete(TimelineEntry.objects.all())
+            followers = User.objects.filter(
+                pk__in=Follow.objects.values('user_id')
+            )
+            for batch in chunked.pk_batches(followers,
+                                            timeline.USER_BATCH_SIZE):
+                timeline.fill(*batch)
+        self.stdout.write(self.style.SUCCESS('Ленты подписок обновлены'))
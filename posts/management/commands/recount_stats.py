@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters, groups
+from posts.models import Group
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, подписок, комментариев и групп'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=counters.BATCH_SIZE,
+            help='Сколько пользователей пересчитывать за одну транзакцию',
+        )
+
+    def handle(self, *args, **options):
+        posts = counters.recount_comments()
+        users = counters.recount_users(options['batch_size'])
+        total = counters.recount_groups()
+        groups.posts_changed(*Group.objects.values_list('pk', flat=True))
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано постов: {posts}, пользователей: {users}, '
+            f'групп: {total}'
+        ))
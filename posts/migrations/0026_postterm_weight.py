@@ -0,0 +1,32 @@
+# Generated by Django 2.2.28 on 2026-10-18 04:07
+
+import math
+
+from django.db import migrations, models
+
+
+def fill_weight(apps, schema_editor):
+    PostTerm = apps.get_model('posts', 'PostTerm')
+    counts = PostTerm.objects.exclude(count=1).values_list(
+        'count', flat=True
+    ).order_by('count').distinct()
+    for count in list(counts):
+        PostTerm.objects.filter(count=count).update(
+            weight=1 + math.log(count)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0025_visible_comment_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postterm',
+            name='weight',
+            field=models.FloatField(default=1),
+        ),
+        migrations.RunPython(fill_weight, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,5 @@
+import json
+
 from django.contrib.auth import get_user_model
 from django.db import models
 
@@ -25,6 +27,13 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+
+    def for_feed(self):
+        """Всё, что нужно карточке поста, одним запросом."""
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
 
     text = models.TextField(
@@ -41,6 +50,15 @@ class Post(models.Model):
                               related_name='posts', blank=True,
                               null=True)
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    image_variants = models.TextField(blank=True, default='', editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    @property
+    def variants(self):
+        """Готовые копии картинки, см. posts.images."""
+        return json.loads(self.image_variants) if self.image_variants else {}
 
     @property
     def short_text(self):
@@ -49,11 +67,31 @@ class Post(models.Model):
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'], name='post_date_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
 
+class CommentManager(models.Manager):
+    # менеджер, а не QuerySet.as_manager(): выборки комментариев
+    # остаются обычным QuerySet
+
+    def visible(self):
+        """Одобренные комментарии — всё, что видят читатели."""
+        return self.filter(active=True)
+
+    def pending(self):
+        """Очередь модерации: ждущие одобрения, старые первыми."""
+        return self.filter(active=False).order_by('created', 'id')
+
+
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE,
                              related_name='comments')
@@ -66,9 +104,25 @@ class Comment(models.Model):
 
     created = models.DateTimeField(auto_now_add=True)
     active = models.BooleanField(default=False)
+    # ключ отложенной записи (posts.write_behind): повторный перенос
+    # той же пачки не создаёт дубликатов
+    token = models.UUIDField(null=True, blank=True, unique=True,
+                             editable=False)
+
+    objects = CommentManager()
 
     class Meta:
         ordering = ['created']
+        # частичные индексы: читателям нужны только одобренные
+        # комментарии поста, модераторам — только ждущие
+        indexes = [
+            models.Index(fields=['post', 'created', 'id'],
+                         name='comment_visible_idx',
+                         condition=models.Q(active=True)),
+            models.Index(fields=['created', 'id'],
+                         name='comment_pending_idx',
+                         condition=models.Q(active=False)),
+        ]
 
 
 class Follow(models.Model):
@@ -89,4 +143,91 @@ class Follow(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['user', 'author'],
                                     name='following_unique')
-        ]
\ No newline at end of file
+        ]
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, которые поддерживаются сигналами."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+
+class GroupStats(models.Model):
+    """Число постов и время последнего поста группы для каталога."""
+
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    post_count = models.PositiveIntegerField(default=0)
+    last_activity = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-last_activity'],
+                         name='groupstats_activity_idx'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Запись в ленте подписок: пост автора, на которого подписан user."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-pub_date', '-post_id']
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='timeline_unique')
+        ]
+
+
+class PostTerm(models.Model):
+    """Строка инвертированного индекса: основа слова и пост, где она есть."""
+
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='terms',
+    )
+    count = models.PositiveIntegerField(default=1)
+    # 1 + ln(count): вклад слова в оценку поста, чтобы ранжировать в SQL
+    weight = models.FloatField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'post'], name='postterm_term_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'term'],
+                                    name='postterm_unique')
+        ]
@@ -0,0 +1,88 @@
+"""Одобрение и удаление комментариев пачками.
+
+Выборка может быть любого размера (например, «выбрать все» в админке):
+она обрабатывается через `chunked.process`, каждая пачка — в своей
+короткой транзакции. Сигналы на каждый комментарий не шлются:
+счётчики сдвигаются одним UPDATE на пост в пачке, а версии кэша
+постов поднимаются один раз в конце. `comment_count` считает только
+одобренные комментарии: одобрение его увеличивает, удаление ждущих
+не трогает.
+
+Длина очереди кэшируется под версией `moderation`, которую поднимает
+любое изменение ждущих комментариев.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+from yatube import db_router
+from . import chunked, counters, feed_cache
+from .models import Comment
+
+BATCH_SIZE = chunked.BATCH_SIZE
+QUEUE = 'moderation'
+
+
+def pending_count():
+    """Число комментариев в очереди, из кэша."""
+    current = feed_cache.versions(QUEUE)
+    key = f'moderation_count:{current[feed_cache.GLOBAL]}.{current[QUEUE]}'
+    count = cache.get(key)
+    if count is None:
+        with db_router.primary_reads():
+            count = Comment.objects.pending().count()
+        cache.set(key, count, getattr(settings, 'FEED_CACHE_TTL', 60 * 60))
+    return count
+
+
+def queue_changed():
+    feed_cache.bump(QUEUE)
+
+
+def _posts(batch):
+    return set(batch.values_list('post_id', 'post__author_id',
+                                 'post__group_id').order_by().distinct())
+
+
+def _changed(posts):
+    for post_id, author_id, group_id in posts:
+        feed_cache.post_changed(post_id, author_id, group_id)
+    queue_changed()
+
+
+def approve(queryset, batch_size=BATCH_SIZE, pause=0):
+    """Одобрить комментарии; вернуть число обработанных."""
+    posts = set()
+
+    def approve_batch(batch):
+        pending = batch.filter(active=False)
+        posts.update(_posts(pending))
+        approved = Counter(pending.values_list('post_id', flat=True))
+        pending.update(active=True)
+        for post_id, count in approved.items():
+            counters.bump_comments(post_id, count)
+
+    total = chunked.process(queryset, approve_batch, batch_size, pause)
+    _changed(posts)
+    return total
+
+
+def delete(queryset, batch_size=BATCH_SIZE, pause=0):
+    """Удалить комментарии; вернуть число удалённых."""
+    posts = set()
+
+    def delete_batch(batch):
+        posts.update(_posts(batch))
+        removed = Counter(batch.filter(active=True).values_list(
+            'post_id', flat=True
+        ))
+        # у комментария нет зависимых строк, поэтому удаляем одним
+        # DELETE без загрузки объектов и сигнала на каждый
+        batch._raw_delete(batch.db)
+        for post_id, count in removed.items():
+            counters.bump_comments(post_id, -count)
+
+    total = chunked.process(queryset, delete_batch, batch_size, pause)
+    _changed(posts)
+    return total
@@ -0,0 +1,173 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+class CursorPage:
+    """Страница ленты, построенная по курсору, а не по номеру."""
+
+    def __init__(self, rows, paginator,
+                 has_next, has_previous, cursor=None):
+        self.rows = rows
+        self.object_list = paginator.transform(rows)
+        self.paginator = paginator
+        self.cursor = cursor
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage {self.cursor or "first"}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def next_cursor(self):
+        if not self._has_next or not self.rows:
+            return None
+        return self.paginator.encode(FORWARD, self.rows[-1])
+
+    def previous_cursor(self):
+        if not self._has_previous or not self.rows:
+            return None
+        return self.paginator.encode(BACKWARD, self.rows[0])
+
+
+def as_django_page(page):
+    """Страница курсора в виде стандартной `Page` для контекста шаблонов.
+
+    `Paginator` такой страницы построен по её же объектам, поэтому COUNT
+    не делается, а переходы берутся у курсорной страницы: `has_next`,
+    `has_previous`, `next_cursor`, `previous_cursor`.
+    """
+    paginator = Paginator(page.object_list, page.paginator.per_page)
+    result = Page(page.object_list, 1, paginator)
+    for name in ('has_next', 'has_previous', 'has_other_pages',
+                 'next_cursor', 'previous_cursor'):
+        setattr(result, name, getattr(page, name))
+    result.cursor = page.cursor
+    return result
+
+
+class CursorPaginator:
+    """Постраничный вывод по ключу `(pub_date, id)` без COUNT и OFFSET.
+
+    Курсор непрозрачен для клиента: это base64 от направления и значений
+    ключа крайнего объекта страницы. Некорректный курсор даёт первую
+    страницу, как `Paginator.get_page` для некорректного номера.
+
+    `transform` получает строки страницы и возвращает объекты для вывода,
+    если ключ хранится не в самих объектах (например, в `TimelineEntry`).
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id'),
+                 transform=list):
+        self.per_page = int(per_page)
+        self.transform = transform
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.descending = self.ordering[0].startswith('-')
+        self.object_list = object_list.order_by(*self.ordering)
+
+    def encode(self, direction, obj):
+        values = [
+            obj._meta.get_field(name).value_to_string(obj)
+            for name in self.fields
+        ]
+        raw = json.dumps([direction] + values, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode(self, cursor):
+        padding = '=' * (-len(cursor) % 4)
+        try:
+            raw = base64.urlsafe_b64decode(cursor + padding)
+            direction, *values = json.loads(raw)
+        except (binascii.Error, ValueError, TypeError):
+            return None
+        if direction not in (FORWARD, BACKWARD):
+            return None
+        if len(values) != len(self.fields):
+            return None
+        meta = self.object_list.model._meta
+        try:
+            values = [
+                meta.get_field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+        except ValidationError:
+            return None
+        if None in values:
+            return None
+        return direction, values
+
+    def _seek(self, values, after):
+        lookup = 'lt' if self.descending == after else 'gt'
+        condition = Q()
+        equal = {}
+        for name, value in zip(self.fields, values):
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def _reversed_ordering(self):
+        return [
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        ]
+
+    def get_page(self, cursor=None):
+        decoded = self.decode(str(cursor)) if cursor else None
+        if decoded is None:
+            items = list(self.object_list[:self.per_page + 1])
+            return CursorPage(items[:self.per_page], self,
+                              has_next=len(items) > self.per_page,
+                              has_previous=False)
+
+        # по другую сторону курсора строк может не быть: ленту
+        # почистили или курсор взят из другой ленты
+        direction, values = decoded
+        if direction == FORWARD:
+            queryset = self.object_list.filter(self._seek(values, after=True))
+            items = list(queryset[:self.per_page + 1])
+            return CursorPage(items[:self.per_page], self,
+                              has_next=len(items) > self.per_page,
+                              has_previous=self._exists(values, after=False),
+                              cursor=cursor)
+
+        queryset = self.object_list.filter(
+            self._seek(values, after=False)
+        ).order_by(*self._reversed_ordering())
+        items = list(queryset[:self.per_page + 1])
+        return CursorPage(items[:self.per_page][::-1], self,
+                          has_next=self._exists(values, after=True),
+                          has_previous=len(items) > self.per_page,
+                          cursor=cursor)
+
+    def _exists(self, values, after):
+        """Есть ли строки по эту сторону курсора, включая строку самого
+        курсора: `exists()` читает одну строку вместо COUNT."""
+        same = Q(**dict(zip(self.fields, values)))
+        return self.object_list.filter(
+            self._seek(values, after=after) | same
+        ).exists()
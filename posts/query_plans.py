@@ -0,0 +1,73 @@
+"""Проверка планов запросов лент через EXPLAIN.
+
+Каждый запрос ленты должен идти по индексу и отдавать строки уже в
+нужном порядке: полный просмотр таблицы или временная сортировка
+означают, что страница сортирует весь набор при каждом показе.
+"""
+import re
+
+from django.db import connection
+
+from . import timeline
+from .models import Comment, Follow, Post, PostTerm
+from .paginator import FORWARD, CursorPaginator
+
+PROBLEMS = {
+    'sqlite': (
+        re.compile(r'\bSCAN (TABLE )?\S+( AS \S+)?$'),
+        re.compile(r'USE TEMP B-TREE'),
+    ),
+    'postgresql': (
+        re.compile(r'Seq Scan'),
+        re.compile(r'^\s*(->\s*)?Sort\b'),
+    ),
+}
+
+
+def _pages(name, queryset, obj, **kwargs):
+    paginator = CursorPaginator(queryset, 10, **kwargs)
+    cursor = paginator.encode(FORWARD, obj)
+    _, values = paginator.decode(cursor)
+    yield name, paginator.object_list[:11]
+    yield f'{name}: следующая страница', paginator.object_list.filter(
+        paginator._seek(values, after=True))[:11]
+    yield f'{name}: предыдущая страница', paginator.object_list.filter(
+        paginator._seek(values, after=False)
+    ).order_by(*paginator._reversed_ordering())[:11]
+
+
+def feed_queries(post):
+    """Запросы страниц сайта на примере поста `post` (с группой)."""
+    yield from _pages('index', Post.objects.for_feed(), post)
+    yield from _pages('group_posts', Post.objects.for_feed().filter(
+        group_id=post.group_id), post)
+    yield from _pages('profile', Post.objects.for_feed().filter(
+        author_id=post.author_id), post)
+    # для курсора нужны только значения ключа
+    comment = Comment(pk=post.pk, created=post.pub_date)
+    yield from _pages('post_view: комментарии',
+                      Comment.objects.visible().filter(post_id=post.pk),
+                      comment, ordering=('created', 'id'))
+    yield from _pages('moderation', Comment.objects.pending(), comment,
+                      ordering=('created', 'id'))
+    yield 'follow_index', timeline.paginator_for(
+        post.author, 10).object_list[:11]
+    yield 'profile: подписан ли', Follow.objects.filter(
+        user_id=post.author_id, author_id=post.author_id)
+    yield 'fan_out: подписчики', Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id')
+    yield 'search', PostTerm.objects.filter(term__in=['котик', 'собак'])
+
+
+def problems(plan, vendor=None):
+    """Строки плана с полным просмотром таблицы или сортировкой."""
+    patterns = PROBLEMS.get(vendor or connection.vendor, ())
+    return [line for line in plan.splitlines()
+            if any(pattern.search(line) for pattern in patterns)]
+
+
+def check(post):
+    """Пары (имя запроса, план, проблемные строки) для всех лент."""
+    for name, queryset in feed_queries(post):
+        plan = queryset.explain()
+        yield name, plan, problems(plan)
@@ -0,0 +1,204 @@
+"""Полнотекстовый поиск по постам через собственный инвертированный индекс.
+
+Текст поста разбивается на слова, слова приводятся к основе русским
+стеммером (алгоритм Snowball) и пишутся в `PostTerm` с числом вхождений.
+Запрос ищет основы по индексу `(term, post)` и ранжирует посты по TF-IDF,
+поэтому `LIKE '%…%'` по всей таблице постов больше не нужен.
+
+Оценка считается в базе (`GROUP BY post ... ORDER BY score LIMIT`): вклад
+слова `1 + ln(count)` хранится в `PostTerm.weight`, а IDF подставляется
+в запрос. Число постов для IDF берётся из кэша.
+"""
+import math
+import re
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Sum, When
+
+from . import chunked
+from .models import Post, PostTerm
+
+MAX_RESULTS = 1000
+DOCUMENTS_KEY = 'search:documents'
+# IDF почти не меняется от нескольких новых постов
+DOCUMENTS_TTL = 10 * 60
+TERM_LENGTH = 64
+BATCH_SIZE = 1000
+
+WORD_RE = re.compile(r'\w+')
+
+STOP_WORDS = frozenset(
+    'и в во не что он на я с со как а то все она так его но да ты к у же '
+    'вы за бы по только ее мне было вот от меня еще нет о из ему теперь '
+    'когда даже ну вдруг ли если уже или ни быть был него до вас нибудь '
+    'опять уж вам ведь там потом себя ничего ей может они тут где есть '
+    'надо ней для мы тебя их чем была сам чтоб без будто чего раз тоже '
+    'себе под будет ж тогда кто этот того потому этого какой совсем ним '
+    'здесь этом один почти мой тем чтобы нее были куда зачем всех никогда '
+    'можно при наконец два об другой хоть после над больше тот через эти '
+    'нас про всего них какая много разве три эту моя впрочем хорошо свою '
+    'этой перед иногда лучше чуть том нельзя такой им более всегда конечно '
+    'всю между the a an and or of to in on is are'.split()
+)
+
+VOWELS = 'аеиоуыэюя'
+PERFECTIVE_GERUND = (('в', 'вши', 'вшись'),
+                     ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'))
+REFLEXIVE = ((), ('ся', 'сь'))
+ADJECTIVE = ((), ('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый',
+                  'ой', 'ем', 'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому',
+                  'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею'))
+PARTICIPLE = (('ем', 'нн', 'вш', 'ющ', 'щ'), ('ивш', 'ывш', 'ующ'))
+VERB = (('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но',
+         'ет', 'ют', 'ны', 'ть', 'ешь', 'нно'),
+        ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей',
+         'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят',
+         'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'))
+NOUN = ((), ('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи',
+             'ии', 'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием',
+             'ем', 'ам', 'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию',
+             'ью', 'ю', 'ия', 'ья', 'я'))
+SUPERLATIVE = ((), ('ейше', 'ейш'))
+DERIVATIONAL = ((), ('ость', 'ост'))
+
+
+def _strip(word, endings):
+    """Отрезать самое длинное окончание; окончания первой группы
+    отрезаются, только если перед ними стоит «а» или «я»."""
+    after_a, anywhere = endings
+    candidates = [(ending, True) for ending in after_a]
+    candidates += [(ending, False) for ending in anywhere]
+    for ending, needs_a in sorted(candidates, key=lambda c: -len(c[0])):
+        if not word.endswith(ending):
+            continue
+        stem = word[:-len(ending)]
+        if needs_a and not stem.endswith(('а', 'я')):
+            continue
+        return stem
+    return None
+
+
+def _region(word, start=0):
+    for index in range(start + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def stem(word):
+    """Основа русского слова по алгоритму Snowball."""
+    word = word.replace('ё', 'е')
+    rv_start = next((index + 1 for index, letter in enumerate(word)
+                     if letter in VOWELS), len(word))
+    r2_start = _region(word, _region(word))
+    head, rv = word[:rv_start], word[rv_start:]
+
+    result = _strip(rv, PERFECTIVE_GERUND)
+    if result is None:
+        rv = _strip(rv, REFLEXIVE) or rv
+        result = _strip(rv, ADJECTIVE)
+        if result is not None:
+            result = _strip(result, PARTICIPLE) or result
+        else:
+            result = _strip(rv, VERB)
+            if result is None:
+                result = _strip(rv, NOUN)
+    rv = rv if result is None else result
+
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    r2 = rv[max(0, r2_start - rv_start):]
+    if _strip(r2, DERIVATIONAL) is not None:
+        rv = _strip(rv, DERIVATIONAL)
+
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    else:
+        superlative = _strip(rv, SUPERLATIVE)
+        if superlative is not None:
+            rv = superlative
+            if rv.endswith('нн'):
+                rv = rv[:-1]
+        elif rv.endswith('ь'):
+            rv = rv[:-1]
+    return head + rv
+
+
+def terms(text):
+    """Основы слов текста без стоп-слов."""
+    for word in WORD_RE.findall(text.lower()):
+        if len(word) > 1 and word not in STOP_WORDS and not word.isdigit():
+            yield stem(word)[:TERM_LENGTH]
+
+
+def _frequencies(text):
+    counts = {}
+    for term in terms(text):
+        counts[term] = counts.get(term, 0) + 1
+    return counts
+
+
+def _postings(post_id, text):
+    return [PostTerm(post_id=post_id, term=term, count=count,
+                     weight=1 + math.log(count))
+            for term, count in _frequencies(text).items()]
+
+
+def index_post(post):
+    """Переиндексировать пост."""
+    with transaction.atomic():
+        PostTerm.objects.filter(post_id=post.pk).delete()
+        PostTerm.objects.bulk_create(_postings(post.pk, post.text))
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    """Перестроить индекс целиком; вернуть число постов."""
+    chunked.delete(PostTerm.objects.all(), batch_size)
+    total = 0
+    rows = []
+    for post_id, text in chunked.rows(Post.objects.values_list('id', 'text'),
+                                      batch_size):
+        rows.extend(_postings(post_id, text))
+        total += 1
+        if len(rows) >= batch_size:
+            PostTerm.objects.bulk_create(rows)
+            rows = []
+    PostTerm.objects.bulk_create(rows)
+    return total
+
+
+def ranked_ids(query, limit=MAX_RESULTS):
+    """id постов, подходящих под запрос, от самых релевантных."""
+    query_terms = set(terms(query))
+    if not query_terms:
+        return []
+    matches = PostTerm.objects.filter(term__in=query_terms)
+    frequency = dict(matches.order_by().values_list('term').annotate(
+        posts=Count('post_id')))
+    if not frequency:
+        return []
+    documents = _documents()
+    score = Sum(Case(
+        *(When(term=term, then=F('weight') * math.log(1 + documents / posts))
+          for term, posts in frequency.items()),
+        output_field=FloatField(),
+    ))
+    return list(matches.values('post_id').annotate(score=score).order_by(
+        '-score', '-post_id'
+    ).values_list('post_id', flat=True)[:limit])
+
+
+def _documents():
+    documents = cache.get(DOCUMENTS_KEY)
+    if documents is None:
+        documents = Post.objects.count()
+        cache.set(DOCUMENTS_KEY, documents, DOCUMENTS_TTL)
+    return max(documents, 1)
+
+
+def posts(ids):
+    """Посты с указанными id в том же порядке."""
+    found = Post.objects.for_feed().in_bulk(ids)
+    return [found[post_id] for post_id in ids if post_id in found]
@@ -0,0 +1,131 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import (counters, feed_cache, follow_graph, groups, moderation, search,
+               tasks, timeline)
+from .models import Comment, Follow, Group, GroupStats, Post
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        counters.create_stats(instance.pk)
+
+
+@receiver(pre_save, sender=Post)
+def post_remember_group(sender, instance, **kwargs):
+    instance._saved_group_id = None
+    if instance.pk is not None:
+        instance._saved_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    feed_cache.post_changed(instance.pk, instance.author_id,
+                            instance.group_id,
+                            getattr(instance, '_saved_group_id', None))
+    search.index_post(instance)
+    if created:
+        counters.bump_user(instance.author_id, 'posts_count', 1)
+        if timeline.fan_out_inline(instance.author_id):
+            timeline.fan_out(instance)
+        else:
+            tasks.fan_out_post.enqueue(instance.pk)
+    _group_posts_changed(
+        instance, None if created else instance._saved_group_id
+    )
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    # до коммита пост ещё виден другим, и читатель сохранил бы его под
+    # новой версией, поэтому ленты сбрасываются после коммита
+    transaction.on_commit(lambda: feed_cache.post_changed(
+        instance.pk, instance.author_id, instance.group_id
+    ))
+    counters.bump_user(instance.author_id, 'posts_count', -1)
+    if instance.group_id is not None:
+        counters.bump_group(instance.group_id, -1)
+        groups.posts_changed(instance.group_id)
+        groups.warm(instance.group_id)
+
+
+def _group_posts_changed(post, old_group_id):
+    if post.group_id != old_group_id:
+        if old_group_id is not None:
+            counters.bump_group(old_group_id, -1)
+        if post.group_id is not None:
+            counters.bump_group(post.group_id, 1, post.pub_date)
+        groups.posts_changed(*{old_group_id, post.group_id} - {None})
+    if post.group_id is not None:
+        groups.warm(post.group_id)
+
+
+def _comment_changed(comment):
+    moderation.queue_changed()
+    post = Post.objects.filter(pk=comment.post_id).values(
+        'author_id', 'group_id'
+    ).first()
+    if post is not None:
+        feed_cache.post_changed(comment.post_id, post['author_id'],
+                                post['group_id'])
+
+
+@receiver(pre_save, sender=Comment)
+def comment_remember_active(sender, instance, **kwargs):
+    instance._saved_active = False
+    if instance.pk is not None:
+        instance._saved_active = bool(Comment.objects.filter(
+            pk=instance.pk
+        ).values_list('active', flat=True).first())
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    # comment_count считает только одобренные комментарии
+    delta = int(instance.active) - int(instance._saved_active)
+    if delta:
+        counters.bump_comments(instance.post_id, delta)
+    _comment_changed(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.active:
+        counters.bump_comments(instance.post_id, -1)
+    _comment_changed(instance)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if created:
+        GroupStats.objects.get_or_create(group=instance)
+    feed_cache.group_changed(instance.pk)
+    groups.changed()
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    feed_cache.everything_changed()
+    groups.changed()
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, 'followers_count', 1)
+        counters.bump_user(instance.user_id, 'following_count', 1)
+        timeline.backfill(instance.user_id, instance.author_id)
+        follow_graph.changed(instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, 'followers_count', -1)
+    counters.bump_user(instance.user_id, 'following_count', -1)
+    timeline.remove_author(instance.user_id, instance.author_id)
+    follow_graph.changed(instance.user_id)
@@ -0,0 +1,57 @@
+"""Потоковая отдача длинных страниц.
+
+При STREAMING_PAGES страница отдаётся `StreamingHttpResponse`:
+сначала всё до первого цикла `{% stream %}` (шапка, карточка автора),
+затем элементы цикла по одному по мере рендера и остаток страницы.
+Клиент получает начало страницы раньше, а ответ целиком не собирается
+в памяти воркера. Элементы QuerySet читаются через `iterator()`.
+
+Потоковый ответ не отдаёт `content`, его нельзя дополнить в middleware
+и у него нет Content-Length, поэтому по умолчанию режим выключен.
+"""
+import re
+import uuid
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.shortcuts import render as render_page
+from django.template import loader
+
+from .templatetags.streaming import DEFERRED, MARKER
+
+
+class Deferred:
+    def __init__(self):
+        self.token = uuid.uuid4().hex
+        self.items = []
+
+    def pattern(self):
+        return re.compile(re.escape(MARKER).replace(
+            re.escape('{token}'), self.token
+        ).replace(re.escape('{index}'), r'(\d+)'))
+
+
+def enabled():
+    return getattr(settings, 'STREAMING_PAGES', False)
+
+
+def _chunks(html, deferred):
+    parts = deferred.pattern().split(html)
+    # split с группой чередует текст и номера отложенных циклов
+    yield parts[0]
+    for index, text in zip(parts[1::2], parts[2::2]):
+        node, context, items = deferred.items[int(index)]
+        yield from node.render_items(context, items)
+        yield text
+
+
+def render(request, template_name, context=None):
+    """Как `django.shortcuts.render`, но с потоковой отдачей циклов."""
+    if not enabled():
+        return render_page(request, template_name, context)
+    deferred = Deferred()
+    context = dict(context or {}, **{DEFERRED: deferred})
+    html = loader.render_to_string(template_name, context, request)
+    return StreamingHttpResponse(
+        _chunks(html, deferred), content_type='text/html; charset=utf-8'
+    )
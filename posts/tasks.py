@@ -0,0 +1,20 @@
+from jobs.queue import task
+
+from . import images, timeline
+from .models import Post
+
+
+@task(cpu_bound=True)
+def build_image_variants(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        images.build_variants(post)
+
+
+@task
+def fan_out_post(post_id):
+    post = Post.objects.filter(pk=post_id).only(
+        'id', 'author_id', 'pub_date'
+    ).first()
+    if post is not None:
+        timeline.fan_out(post)
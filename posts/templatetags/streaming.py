@@ -0,0 +1,48 @@
+from django import template
+from django.db.models import QuerySet
+
+register = template.Library()
+
+# ключ контекста со списком отложенных циклов (posts.streaming)
+DEFERRED = 'streaming_deferred'
+MARKER = '<!--stream:{token}:{index}-->'
+
+
+class StreamNode(template.Node):
+    """Цикл, который при потоковом ответе выводится после начала страницы."""
+
+    def __init__(self, name, sequence, nodelist):
+        self.name = name
+        self.sequence = sequence
+        self.nodelist = nodelist
+
+    def render(self, context):
+        items = self.sequence.resolve(context, ignore_failures=True)
+        if items is None:
+            items = ()
+        deferred = context.get(DEFERRED)
+        if deferred is None:
+            return ''.join(self.render_items(context, items))
+        if isinstance(items, QuerySet):
+            items = items.iterator()
+        deferred.items.append((self, context.__copy__(), items))
+        return MARKER.format(token=deferred.token,
+                             index=len(deferred.items) - 1)
+
+    def render_items(self, context, items):
+        for item in items:
+            with context.push(**{self.name: item}):
+                yield self.nodelist.render(context)
+
+
+@register.tag
+def stream(parser, token):
+    """{% stream post in page %}...{% endstream %}"""
+    bits = token.split_contents()
+    if len(bits) != 4 or bits[2] != 'in':
+        raise template.TemplateSyntaxError(
+            "'stream' ожидает вид {% stream item in sequence %}"
+        )
+    nodelist = parser.parse(('endstream',))
+    parser.delete_first_token()
+    return StreamNode(bits[1], parser.compile_filter(bits[3]), nodelist)
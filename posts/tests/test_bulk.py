@@ -0,0 +1,119 @@
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from posts import bulk, search
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+
+
+class BulkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(title='group', slug='group',
+                                         description='group')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_data(self):
+        for number in range(7):
+            post = Post.objects.create(text=f'котики {number}',
+                                       author=self.author,
+                                       group=self.group if number % 2
+                                       else None)
+            Comment.objects.create(post=post, author=self.reader,
+                                   text='comment', active=bool(number % 2))
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def round_trip(self, extension):
+        self.make_data()
+        dates = list(Post.objects.values_list('id', 'pub_date'))
+        for kind in bulk.ORDER:
+            call_command('export_data', kind,
+                         os.path.join(self.directory, f'{kind}.{extension}'),
+                         batch_size=3, stdout=io.StringIO())
+        for model in (Follow, Comment, Post, Group):
+            model.objects.all().delete()
+        get_user_model().objects.all().delete()
+
+        for kind in bulk.ORDER:
+            call_command('import_data', kind,
+                         os.path.join(self.directory, f'{kind}.{extension}'),
+                         batch_size=3, no_rebuild=kind != 'follows',
+                         stdout=io.StringIO())
+        self.assertEqual(list(Post.objects.values_list('id', 'pub_date')),
+                         dates)
+        self.assertEqual(Comment.objects.filter(active=True).count(), 3)
+        self.assertEqual(Post.objects.filter(group=None).count(), 4)
+        # счётчики пересчитаны по одобренным комментариям
+        self.assertEqual(dict(Post.objects.values_list('text',
+                                                       'comment_count')),
+                         {f'котики {number}': number % 2
+                          for number in range(7)})
+        self.assertEqual(TimelineEntry.objects.count(), 7)
+        self.assertEqual(len(search.ranked_ids('котики')), 7)
+
+    def test_jsonl_round_trip(self):
+
+        """Выгрузка и загрузка JSON Lines сохраняют данные."""
+
+        self.round_trip('jsonl')
+
+    def test_csv_round_trip(self):
+
+        """Выгрузка и загрузка CSV сохраняют данные."""
+
+        self.round_trip('csv')
+
+    def test_export_reads_in_batches(self):
+
+        """Экспорт читает таблицу пачками, а не целиком."""
+
+        self.make_data()
+        with self.assertNumQueries(3):
+            self.assertEqual(len(list(bulk.rows('posts', batch_size=3))), 7)
+
+    def test_insert_keeps_dates_without_touching_fields(self):
+
+        """Вставка сохраняет заданные даты и не меняет поля модели,
+        общие для всех потоков."""
+
+        field = Post._meta.get_field('pub_date')
+        manager = Post._base_manager
+        original = manager._insert
+
+        def check(*args, **kwargs):
+            self.assertTrue(field.auto_now_add)
+            return original(*args, **kwargs)
+
+        date = timezone.now() - timedelta(days=3)
+        with mock.patch.object(manager, '_insert', side_effect=check):
+            bulk.insert(Post, [Post(text='old', author=self.author,
+                                    pub_date=date)])
+        self.assertEqual(Post.objects.get(text='old').pub_date, date)
+
+    def test_ignore_conflicts(self):
+
+        """Повторная загрузка с --ignore-conflicts пропускает дубли."""
+
+        stream = io.StringIO()
+        bulk.write('groups', stream)
+        stream.seek(0)
+        count = bulk.load('groups', bulk.read(stream), ignore_conflicts=True)
+        self.assertEqual(count, 1)
+        self.assertEqual(Group.objects.count(), 1)
@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from yatube.cache_backends import SQLiteCache
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        options.setdefault('ACCESS_RESOLUTION', 0)
+        options.setdefault('STATS_FLUSH_EVERY', 1)
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_basic_operations(self):
+
+        """Кэш поддерживает обычный интерфейс бэкенда Django."""
+
+        cache = self.cache
+        cache.set('key', {'value': 1})
+        self.assertEqual(cache.get('key'), {'value': 1})
+        self.assertFalse(cache.add('key', 'other'))
+        self.assertTrue(cache.add('new', 'other'))
+        self.assertEqual(cache.get_many(['key', 'new', 'missing']),
+                         {'key': {'value': 1}, 'new': 'other'})
+        cache.set('counter', 1)
+        self.assertEqual(cache.incr('counter', 2), 3)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+        cache.delete('key')
+        self.assertIsNone(cache.get('key'))
+        cache.set('expired', 1, timeout=-1)
+        self.assertFalse(cache.has_key('expired'))
+        cache.clear()
+        self.assertIsNone(cache.get('new'))
+
+    def test_shared_between_instances(self):
+
+        """Два экземпляра с одним файлом видят одни и те же записи."""
+
+        self.cache.set('shared', 'value')
+        self.assertEqual(self.make_cache().get('shared'), 'value')
+
+    def test_lru_eviction_by_entries(self):
+
+        """При переполнении вытесняются давно не читавшиеся записи."""
+
+        cache = self.make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=3)
+        for key in 'abc':
+            cache.set(key, key)
+        cache.get('a')
+        cache.set('d', 'd')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 'a')
+        self.assertEqual(cache.get('d'), 'd')
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_eviction_by_size(self):
+
+        """Суммарный размер значений не превышает MAX_BYTES."""
+
+        cache = self.make_cache(MAX_BYTES=2500)
+        for number in range(5):
+            cache.set(f'key-{number}', 'x' * 1000)
+        self.assertLessEqual(cache.stats()['bytes'], 2500)
+        self.assertEqual(cache.get('key-4'), 'x' * 1000)
+
+    def test_incr_keeps_size_total(self):
+
+        """incr учитывает изменение размера значения в общей сумме."""
+
+        cache = self.cache
+        cache.set('counter', 1)
+        cache.incr('counter', 10 ** 30)
+        stored, = cache._db.execute('SELECT SUM(size) FROM cache').fetchone()
+        self.assertEqual(cache.stats()['bytes'], stored)
+
+    def test_stats(self):
+
+        """Статистика считает попадания и промахи."""
+
+        self.cache.set('key', 'value')
+        self.cache.get('key')
+        self.cache.get('missing')
+        stats = self.cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['entries'], 1)
@@ -0,0 +1,114 @@
+from unittest import mock
+
+from django.contrib.admin import helpers
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import chunked, counters, feed_cache, moderation
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class ChunkedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.posts = [Post.objects.create(text=f'post {number}',
+                                         author=cls.author)
+                     for number in range(2)]
+        for number in range(7):
+            Comment.objects.create(post=cls.posts[number % 2],
+                                   author=cls.author, text=f'c{number}')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_batches_cover_queryset_in_pk_order(self):
+
+        """Пачки идут по возрастанию pk и покрывают всю выборку."""
+
+        ids = list(Comment.objects.order_by('pk').values_list('pk',
+                                                              flat=True))
+        batches = list(chunked.pk_batches(Comment.objects.all(), 3))
+        self.assertEqual([len(batch) for batch in batches], [3, 3, 1])
+        self.assertEqual(sum(batches, []), ids)
+        self.assertEqual(
+            [row[0] for row in chunked.rows(
+                Comment.objects.values_list('pk', 'text'), 3)], ids)
+        self.assertEqual(
+            [comment.pk for comment in chunked.objects(
+                Comment.objects.all(), 3)], ids)
+
+    def test_process_uses_transaction_per_batch(self):
+
+        """Каждая пачка — отдельная транзакция, даже если обработка
+        убирает строки из исходной выборки."""
+
+        hidden = Comment.objects.filter(active=False)
+        with mock.patch('posts.chunked.transaction.atomic',
+                        wraps=chunked.transaction.atomic) as atomic:
+            total = chunked.process(
+                hidden, lambda batch: batch.update(active=True), 2
+            )
+        self.assertEqual(total, 7)
+        self.assertEqual(atomic.call_count, 4)
+        self.assertFalse(hidden.exists())
+
+    def test_approve_bumps_post_versions(self):
+
+        """Одобрение пачками сбрасывает кэш затронутых постов."""
+
+        name = f'post:{self.posts[0].pk}'
+        before = feed_cache.versions(name)[name]
+        self.assertEqual(moderation.approve(Comment.objects.all(), 2), 7)
+        self.assertEqual(Comment.objects.filter(active=True).count(), 7)
+        self.assertGreater(feed_cache.versions(name)[name], before)
+        self.assertEqual(
+            list(Post.objects.order_by('pk').values_list('comment_count',
+                                                         flat=True)),
+            [4, 3],
+        )
+
+    def test_delete_adjusts_counters(self):
+
+        """Удаление пачками уменьшает comment_count постов на число
+        одобренных комментариев."""
+
+        Comment.objects.filter(text__in=['c0', 'c1', 'c3']).update(
+            active=True
+        )
+        counters.recount_comments()
+        first = self.posts[0]
+        deleted = moderation.delete(Comment.objects.filter(post=first), 2)
+        self.assertEqual(deleted, 4)
+        self.assertFalse(Comment.objects.filter(post=first).exists())
+        self.assertEqual(Post.objects.get(pk=first.pk).comment_count, 0)
+        self.assertEqual(
+            Post.objects.get(pk=self.posts[1].pk).comment_count, 2
+        )
+
+    def test_admin_actions(self):
+
+        """В админке вместо delete_selected — удаление пачками."""
+
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        client = Client()
+        client.force_login(admin)
+        url = reverse('admin:posts_comment_changelist')
+        response = client.get(url)
+        actions = dict(response.context['action_form'].fields[
+            'action'].choices)
+        self.assertNotIn('delete_selected', actions)
+        self.assertIn('delete_in_batches', actions)
+
+        client.post(url, {
+            'action': 'delete_in_batches',
+            'select_across': '1',
+            'index': '0',
+            helpers.ACTION_CHECKBOX_NAME: [Comment.objects.first().pk],
+        })
+        self.assertFalse(Comment.objects.exists())
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+
+@override_settings(COMMENTS_PAGE_SIZE=3)
+class CommentsPagingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create(username='author')
+        cls.post = Post.objects.create(text='text', author=cls.author)
+        cls.readers = [User.objects.create(username=f'reader-{number}')
+                       for number in range(4)]
+        cls.comments = [
+            Comment.objects.create(post=cls.post, author=reader,
+                                   text=f'comment {number}', active=True)
+            for number, reader in enumerate(cls.readers * 2)
+        ]
+        Comment.objects.create(post=cls.post, author=cls.author,
+                               text='hidden', active=False)
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('post', args=['author', self.post.id])
+
+    def test_first_page_and_queries(self):
+
+        """Страница поста показывает первую порцию комментариев,
+        авторы приходят тем же запросом."""
+
+        response = Client().get(self.url)
+        self.assertEqual([comment.text for comment in
+                          response.context['comments']],
+                         ['comment 0', 'comment 1', 'comment 2'])
+        self.assertTrue(response.context['comments_page'].has_next())
+        with self.assertNumQueries(0):
+            for comment in response.context['comments']:
+                comment.author.username
+
+    def test_hidden_comments_never_shown(self):
+
+        """Неодобренные комментарии не попадают на страницу."""
+
+        seen = []
+        cursor = None
+        while True:
+            response = Client().get(
+                reverse('comments', args=['author', self.post.id]),
+                {'cursor': cursor} if cursor else {},
+            )
+            page = response.context['comments_page']
+            seen.extend(comment.text for comment in page)
+            cursor = page.next_cursor()
+            if cursor is None:
+                break
+        self.assertEqual(seen, [comment.text for comment in self.comments])
+        self.assertNotContains(response, 'hidden')
+
+    def test_fragment_endpoint(self):
+
+        """Следующая порция отдаётся фрагментом без обёртки страницы."""
+
+        first = Client().get(self.url).context['comments_page']
+        response = Client().get(
+            reverse('comments', args=['author', self.post.id]),
+            {'cursor': first.next_cursor()},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, '<html')
+        self.assertContains(response, 'comment 3')
+        self.assertContains(response, 'data-comments-more')
+
+        response = Client().get(self.url, {'comments': first.next_cursor()})
+        self.assertEqual(response.context['comments'][0].text, 'comment 3')
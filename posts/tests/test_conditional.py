@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(title='group', slug='group',
+                                         description='group')
+        cls.post = Post.objects.create(text='text', author=cls.author,
+                                       group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def assertRevalidates(self, url, change):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Cookie', response['Vary'])
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_index(self):
+
+        """Главная отвечает 304, пока в ленте ничего не поменялось."""
+
+        self.assertRevalidates(
+            reverse('index'),
+            lambda: Post.objects.create(text='new', author=self.author),
+        )
+
+    def test_group(self):
+
+        """Страница группы учитывает изменения самой группы."""
+
+        def change():
+            self.group.description = 'changed'
+            self.group.save()
+
+        self.assertRevalidates(reverse('group', args=['group']), change)
+
+    def test_profile(self):
+
+        """Профиль учитывает счётчики подписчиков."""
+
+        self.assertRevalidates(
+            reverse('profile', args=['author']),
+            lambda: Follow.objects.create(user=self.reader,
+                                          author=self.author),
+        )
+
+    def test_post(self):
+
+        """Страница поста учитывает новые комментарии."""
+
+        self.assertRevalidates(
+            reverse('post', args=['author', self.post.id]),
+            lambda: Comment.objects.create(post=self.post, author=self.reader,
+                                           text='comment', active=True),
+        )
+
+    def test_etag_depends_on_user(self):
+
+        """Гость и пользователь получают разные ETag."""
+
+        url = reverse('index')
+        etag = self.client.get(url)['ETag']
+        self.client.force_login(self.reader)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,114 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from posts import counters
+from posts.models import Comment, Follow, Post, UserStats
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+
+    def stats(self, user):
+        return counters.stats_for(user)
+
+    def test_stats_row_created_with_user(self):
+
+        """Строка UserStats появляется вместе с пользователем."""
+
+        user = get_user_model().objects.create(username='newcomer')
+        stats = UserStats.objects.get(user=user)
+        self.assertEqual((stats.posts_count, stats.followers_count,
+                          stats.following_count), (0, 0, 0))
+
+    def test_missing_stats_are_counted_without_writing(self):
+
+        """Без строки UserStats счётчики считаются по данным, а чтение
+        ничего не пишет."""
+
+        Post.objects.create(text='post', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserStats.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            stats = self.stats(self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(stats.following_count, 0)
+        self.assertTrue(all(query['sql'].startswith('SELECT')
+                            for query in queries))
+        self.assertFalse(UserStats.objects.exists())
+
+    def test_signals_keep_user_stats(self):
+
+        """Посты и подписки сдвигают счётчики пользователя."""
+
+        self.stats(self.author)
+        self.stats(self.reader)
+        post = Post.objects.create(text='post', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+
+        post.delete()
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_signals_keep_comment_count(self):
+
+        """Одобренные комментарии сдвигают comment_count поста, ждущие
+        модерации — нет."""
+
+        post = Post.objects.create(text='post', author=self.author)
+        comment = Comment.objects.create(post=post, author=self.reader,
+                                         text='comment')
+        Comment.objects.create(post=post, author=self.reader,
+                               text='pending').delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 0)
+
+        comment.active = True
+        comment.save()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 0)
+
+    def test_recount_repairs_drift(self):
+
+        """Команда recount_stats чинит разошедшиеся счётчики."""
+
+        post = Post.objects.create(text='post', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='comment',
+                               active=True)
+        Comment.objects.create(post=post, author=self.reader, text='pending')
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserStats.objects.update_or_create(
+            user=self.author,
+            defaults={'posts_count': 42, 'followers_count': 42}
+        )
+        Post.objects.update(comment_count=42)
+
+        call_command('recount_stats', batch_size=1, stdout=StringIO())
+
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).following_count, 1)
@@ -0,0 +1,102 @@
+from unittest import mock
+
+from django.contrib.sessions.models import Session
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from posts import feed_cache
+from posts.models import Post
+from posts.paginator import CursorPage
+from yatube import db_router
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+@mock.patch('yatube.db_router.check_connections')
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        self.router = db_router.ReplicaRouter()
+        self.middleware = db_router.ReplicaMiddleware(self.view)
+        self.factory = RequestFactory()
+        db_router._unhealthy.clear()
+
+    def view(self, request):
+        self.read_from = self.router.db_for_read(Post)
+        self.session_from = self.router.db_for_read(Session)
+        return HttpResponse()
+
+    def test_reads_outside_requests_use_primary(self, check):
+
+        """Команды и воркер читают с основной базы."""
+
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_safe_request_reads_from_replica(self, check):
+
+        """GET читает ленты с реплики, а сессии — с основной базы."""
+
+        # TestCase держит транзакцию, внутри которой чтение идёт
+        # с основной базы
+        with mock.patch.object(connections['default'], 'in_atomic_block',
+                               False):
+            response = self.middleware(self.factory.get('/'))
+        self.assertEqual(self.read_from, 'replica1')
+        self.assertEqual(self.session_from, 'default')
+        self.assertNotIn(db_router.PIN_COOKIE, response.cookies)
+        check.assert_called_once_with()
+
+    def test_cached_pages_are_filled_from_primary(self, check):
+
+        """Страница для кэша с версией читается с основной базы: отставшая
+        реплика не сохранит старые строки под новой версией."""
+
+        paginator = mock.Mock(transform=list)
+        used = []
+
+        def get_page(cursor):
+            used.append(self.router.db_for_read(Post))
+            return CursorPage([], paginator, False, False)
+
+        paginator.get_page.side_effect = get_page
+
+        def view(request):
+            feed_cache.get_page('feed:test', paginator, None)
+            self.read_from = self.router.db_for_read(Post)
+            return HttpResponse()
+
+        with mock.patch.object(connections['default'], 'in_atomic_block',
+                               False):
+            db_router.ReplicaMiddleware(view)(self.factory.get('/'))
+        self.assertEqual(used, ['default'])
+        self.assertEqual(self.read_from, 'replica1')
+
+    def test_write_pins_client_to_primary(self, check):
+
+        """После POST клиент какое-то время читает с основной базы."""
+
+        response = self.middleware(self.factory.post('/new/'))
+        self.assertEqual(self.read_from, 'default')
+        cookie = response.cookies[db_router.PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], 10)
+
+        request = self.factory.get('/')
+        request.COOKIES[db_router.PIN_COOKIE] = '1'
+        self.middleware(request)
+        self.assertEqual(self.read_from, 'default')
+
+    def test_unhealthy_replica_is_skipped(self, check):
+
+        """Реплика, не прошедшая проверку, временно не используется."""
+
+        connection = connections['default']
+        with override_settings(DATABASE_REPLICAS=['default']), \
+                mock.patch.object(connection, 'is_usable',
+                                  return_value=False), \
+                mock.patch.object(connection, 'close') as close:
+            connection.ensure_connection()
+            self.assertFalse(db_router.check('default'))
+            close.assert_called_once_with()
+            self.assertEqual(db_router.replicas(), [])
+        self.assertTrue(db_router.check('default'))
+        self.assertNotIn('default', db_router._unhealthy)
@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import TestCase
+
+from posts import feed_cache, follow_graph
+from posts.models import Follow
+
+User = get_user_model()
+
+
+class FollowGraphTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [User.objects.create_user(username=f'author-{number}')
+                       for number in range(5)]
+        for author in cls.authors[::-2]:
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        cache.clear()
+        follow_graph._following.clear()
+
+    def test_answers_from_sorted_ids(self):
+
+        """Подписки — отсортированный массив id, ответы без базы."""
+
+        followed = sorted(author.pk for author in self.authors[::2])
+        with self.assertNumQueries(1):
+            self.assertEqual(list(follow_graph.following_ids(self.reader)),
+                             followed)
+        with self.assertNumQueries(0):
+            self.assertEqual(follow_graph.following_count(self.reader), 3)
+            self.assertTrue(
+                follow_graph.follows(self.reader, self.authors[0]))
+            self.assertFalse(
+                follow_graph.follows(self.reader, self.authors[1]))
+            self.assertEqual(
+                follow_graph.followed_among(
+                    self.reader, [author.pk for author in self.authors]
+                ),
+                set(followed),
+            )
+        self.assertFalse(
+            follow_graph.follows(AnonymousUser(), self.authors[0]))
+
+    def test_shared_cache_serves_other_processes(self):
+
+        """Процесс без своей копии берёт массив из общего кэша."""
+
+        follow_graph.following_ids(self.reader)
+        follow_graph._following.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(follow_graph.following_count(self.reader), 3)
+
+    def test_follow_writes_invalidate(self):
+
+        """Подписка и отписка сразу видны в графе."""
+
+        self.assertFalse(follow_graph.follows(self.reader, self.authors[1]))
+        Follow.objects.create(user=self.reader, author=self.authors[1])
+        self.assertTrue(follow_graph.follows(self.reader, self.authors[1]))
+
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertEqual(follow_graph.following_count(self.reader), 0)
+
+    def test_global_version_drops_graph(self):
+
+        """Общая версия (импорт данных) сбрасывает весь граф."""
+
+        follow_graph.following_ids(self.reader)
+        Follow.objects.bulk_create([Follow(user=self.reader,
+                                           author=self.authors[1])])
+        feed_cache.everything_changed()
+        self.assertTrue(follow_graph.follows(self.reader, self.authors[1]))
@@ -0,0 +1,121 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import counters, feed_cache, groups
+from posts.models import Group, GroupStats, Post
+
+User = get_user_model()
+
+
+def _on_commit_now():
+    # TestCase не коммитит, поэтому колбэки вызываются сразу
+    return mock.patch('posts.groups.transaction.on_commit',
+                      side_effect=lambda callback: callback())
+
+
+class GroupDirectoryTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.cats = Group.objects.create(title='Коты', slug='cats',
+                                        description='Про котов')
+        cls.dogs = Group.objects.create(title='Собаки', slug='dogs',
+                                        description='Про собак')
+        cls.empty = Group.objects.create(title='Пусто', slug='empty',
+                                         description='Ничего')
+        Post.objects.create(text='кот', author=cls.author, group=cls.cats)
+        cls.latest = Post.objects.create(text='пёс', author=cls.author,
+                                         group=cls.dogs)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_directory_counts_and_order(self):
+
+        """Каталог показывает число постов, свежие группы — выше."""
+
+        response = Client().get(reverse('groups'))
+        rows = [(stats.group.slug, stats.post_count)
+                for stats in response.context['page']]
+        self.assertEqual(rows, [('dogs', 1), ('cats', 1), ('empty', 0)])
+        self.assertEqual(response.context['page'][0].last_activity,
+                         self.latest.pub_date)
+        self.assertContains(response, reverse('group', args=['cats']))
+
+    def test_counts_follow_post_writes(self):
+
+        """Счётчики меняются при создании, переносе и удалении поста."""
+
+        self.assertEqual(groups.post_count(self.cats), 1)
+        post = Post.objects.create(text='ещё кот', author=self.author,
+                                   group=self.cats)
+        self.assertEqual(groups.post_count(self.cats), 2)
+
+        post.group = self.dogs
+        post.save()
+        self.assertEqual(groups.post_count(self.cats), 1)
+        self.assertEqual(groups.post_count(self.dogs), 2)
+
+        post.delete()
+        stats = GroupStats.objects.get(group=self.dogs)
+        self.assertEqual(stats.post_count, 1)
+        self.assertEqual(stats.last_activity, self.latest.pub_date)
+
+    def test_slug_cache(self):
+
+        """Группа по slug берётся из памяти, пока группу не изменили."""
+
+        groups.by_slug('cats')
+        with self.assertNumQueries(0):
+            self.assertEqual(groups.by_slug('cats'), self.cats)
+        self.cats.title = 'Кошки'
+        self.cats.save()
+        self.assertEqual(groups.by_slug('cats').title, 'Кошки')
+        with self.assertRaises(Http404):
+            groups.by_slug('missing')
+
+    def test_post_writes_keep_slug_cache(self):
+
+        """Посты в группах не сбрасывают кэш по slug и счётчики других
+        групп."""
+
+        groups.by_slug('cats')
+        self.assertEqual(groups.post_count(self.cats), 1)
+        post = Post.objects.create(text='пёс', author=self.author,
+                                   group=self.dogs)
+        self.assertIn('cats', groups._by_slug)
+        with self.assertNumQueries(0):
+            self.assertEqual(groups.by_slug('cats'), self.cats)
+            self.assertEqual(groups.post_count(self.cats), 1)
+        self.assertEqual(groups.post_count(self.dogs), 2)
+        post.delete()
+        self.assertEqual(groups.post_count(self.dogs), 1)
+        self.assertIn('cats', groups._by_slug)
+
+    def test_first_page_is_built_on_write(self):
+
+        """После записи поста первая страница группы уже в кэше."""
+
+        with _on_commit_now():
+            post = Post.objects.create(text='новый кот', author=self.author,
+                                       group=self.cats)
+        with self.assertNumQueries(0):
+            page = feed_cache.get_page(feed_cache.group_feed(self.cats.pk),
+                                       groups.paginator(self.cats), None)
+        self.assertEqual(page.object_list[0], post)
+
+    def test_recount(self):
+
+        """Пересчёт восстанавливает сбитые счётчики."""
+
+        GroupStats.objects.update(post_count=42, last_activity=None)
+        self.assertEqual(counters.recount_groups(), 3)
+        stats = GroupStats.objects.get(group=self.dogs)
+        self.assertEqual(stats.post_count, 1)
+        self.assertEqual(stats.last_activity, self.latest.pub_date)
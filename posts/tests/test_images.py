@@ -0,0 +1,135 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from jobs.models import Job
+from jobs.worker import run_pending
+from posts import images
+from posts.models import Post
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def uploaded_image(name='photo.png', size=(200, 100)):
+    buffer = io.BytesIO()
+    Image.new('RGBA', size, (255, 0, 0, 255)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(),
+                              content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageVariantsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create(username='photographer')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def variant_files(self, post):
+        directory = os.path.join(MEDIA_ROOT, 'posts', 'variants',
+                                 str(post.pk))
+        return sorted(os.listdir(directory)) if os.path.isdir(directory) \
+            else []
+
+    def test_new_post_builds_variants(self):
+
+        """Копии картинки строятся фоновой задачей после создания поста."""
+
+        self.client.post(reverse('new'), {'text': 'with image',
+                                          'image': uploaded_image()})
+        self.assertEqual(Job.objects.filter(status=Job.PENDING).count(), 1)
+        self.assertEqual(run_pending(), 1)
+        post = Post.objects.get(text='with image')
+        variants = post.variants
+        self.assertTrue(variants['placeholder'].startswith('data:image/'))
+        self.assertEqual(len(variants['jpeg_srcset'].split(', ')),
+                         len(images.WIDTHS))
+        for candidate in variants['jpeg_srcset'].split(', '):
+            url, width = candidate.split()
+            path = os.path.join(MEDIA_ROOT,
+                                url[len('/media/'):].replace('/', os.sep))
+            with Image.open(path) as variant:
+                self.assertEqual(f'{variant.width}w', width)
+                self.assertEqual(variant.height,
+                                 images._height(variant.width))
+
+    def test_card_uses_srcset_without_thumbnail_lookup(self):
+
+        """Карточка выводит srcset из сохранённых копий."""
+
+        post = Post.objects.create(text='card', author=self.user,
+                                   image=uploaded_image())
+        images.build_variants(post)
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, post.variants['jpeg_srcset'])
+
+    def test_edit_without_new_image_keeps_variants(self):
+
+        """Правка текста не перестраивает копии."""
+
+        post = Post.objects.create(text='card', author=self.user,
+                                   image=uploaded_image())
+        images.build_variants(post)
+        variants = Post.objects.get(pk=post.pk).image_variants
+        self.client.post(
+            reverse('post_edit', args=[self.user.username, post.pk]),
+            {'text': 'edited'},
+        )
+        self.assertFalse(Job.objects.exists())
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'edited')
+        self.assertEqual(post.image_variants, variants)
+
+    def test_new_image_drops_old_variants(self):
+
+        """Новая картинка сразу убирает копии старой, задача удаляет
+        их файлы."""
+
+        post = Post.objects.create(text='card', author=self.user,
+                                   image=uploaded_image('old.png'))
+        images.build_variants(post)
+        old = self.variant_files(post)
+        self.client.post(
+            reverse('post_edit', args=[self.user.username, post.pk]),
+            {'text': 'card', 'image': uploaded_image('new.png')},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants, '')
+
+        self.assertEqual(run_pending(), 1)
+        post.refresh_from_db()
+        self.assertIn('new', post.variants['jpeg_srcset'])
+        files = self.variant_files(post)
+        self.assertTrue(files)
+        self.assertFalse(set(files) & set(old))
+
+    def test_cleared_image_removes_variants(self):
+
+        """Убранная картинка уносит с собой копии."""
+
+        post = Post.objects.create(text='card', author=self.user,
+                                   image=uploaded_image())
+        images.build_variants(post)
+        self.client.post(
+            reverse('post_edit', args=[self.user.username, post.pk]),
+            {'text': 'card', 'image-clear': 'on'},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants, '')
+        run_pending()
+        self.assertEqual(self.variant_files(post), [])
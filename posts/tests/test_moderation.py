@@ -0,0 +1,118 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+import yatube.settings as st
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class ModerationQueueTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.moderator = User.objects.create_user(username='moderator',
+                                                 is_staff=True)
+        cls.post = Post.objects.create(text='post', author=cls.author)
+        cls.pending = [
+            Comment.objects.create(post=cls.post, author=cls.author,
+                                   text=f'pending {number}')
+            for number in range(st.PAGINATOR_PAGE_SIZE + 2)
+        ]
+        Comment.objects.create(post=cls.post, author=cls.author,
+                               text='approved', active=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.moderator)
+        self.url = reverse('moderation')
+
+    def test_only_staff(self):
+
+        """Очередь видна только сотрудникам."""
+
+        reader = Client()
+        reader.force_login(self.author)
+        response = reader.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('admin:login'), response.url)
+
+    def test_queue_pages_oldest_first(self):
+
+        """Очередь идёт от старых к новым страницами по курсору."""
+
+        with self.assertNumQueries(4):
+            first = self.client.get(self.url)
+        page = first.context['page']
+        self.assertEqual(first.context['pending_count'],
+                         len(self.pending))
+        self.assertEqual(list(page),
+                         self.pending[:st.PAGINATOR_PAGE_SIZE])
+        second = self.client.get(self.url, {'page': page.next_cursor()})
+        self.assertEqual(list(second.context['page']),
+                         self.pending[st.PAGINATOR_PAGE_SIZE:])
+
+    def test_queue_length_is_cached(self):
+
+        """Длина очереди не пересчитывается на каждой странице, но
+        меняется вместе с очередью."""
+
+        self.client.get(self.url)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(response.context['pending_count'],
+                         len(self.pending))
+
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='new')
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['pending_count'],
+                         len(self.pending) + 1)
+
+    def test_approve_selected(self):
+
+        """Одобренные комментарии уходят из очереди на страницу поста."""
+
+        chosen = self.pending[:2]
+        self.client.post(self.url, {
+            'action': 'approve',
+            'comment': [comment.pk for comment in chosen],
+        })
+        self.assertEqual(Comment.objects.pending().count(),
+                         len(self.pending) - 2)
+        response = Client().get(reverse('post',
+                                        args=['author', self.post.pk]))
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['pending 0', 'pending 1', 'approved'],
+        )
+        self.assertEqual(Post.objects.get(pk=self.post.pk).comment_count, 3)
+
+    def test_malformed_ids_are_ignored(self):
+
+        """Некорректные id в форме отбрасываются, а не роняют страницу."""
+
+        response = self.client.post(self.url, {
+            'action': 'approve',
+            'comment': ['abc', '', str(self.pending[0].pk)],
+        })
+        self.assertRedirects(response, self.url)
+        self.assertEqual(Comment.objects.pending().count(),
+                         len(self.pending) - 1)
+
+    def test_reject_whole_queue(self):
+
+        """Отклонение всей очереди не трогает одобренные."""
+
+        response = self.client.post(self.url, {'action': 'reject',
+                                               'all': '1'})
+        self.assertRedirects(response, self.url)
+        self.assertFalse(Comment.objects.pending().exists())
+        self.assertEqual(list(Comment.objects.values_list('text',
+                                                          flat=True)),
+                         ['approved'])
+        self.assertEqual(Post.objects.get(pk=self.post.pk).comment_count, 1)
@@ -0,0 +1,183 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+from posts.paginator import BACKWARD, FORWARD, CursorPaginator
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create(username='paginated')
+        Post.objects.bulk_create(
+            Post(text=f'post {number}', author=cls.user)
+            for number in range(25)
+        )
+
+    def setUp(self):
+        self.paginator = CursorPaginator(Post.objects.all(), 10)
+
+    def test_pages_follow_pub_date_and_id(self):
+
+        """Курсоры обходят всю ленту без пропусков и повторов."""
+
+        expected = list(
+            Post.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True))
+        seen = []
+        page = self.paginator.get_page()
+        self.assertFalse(page.has_previous())
+        while True:
+            seen.extend(post.id for post in page)
+            if not page.has_next():
+                break
+            page = self.paginator.get_page(page.next_cursor())
+            self.assertTrue(page.has_previous())
+        self.assertEqual(seen, expected)
+
+    def test_previous_cursor_returns_same_page(self):
+
+        """Курсор назад возвращает предыдущую страницу."""
+
+        first = self.paginator.get_page()
+        second = self.paginator.get_page(first.next_cursor())
+        back = self.paginator.get_page(second.previous_cursor())
+        self.assertEqual([post.id for post in back],
+                         [post.id for post in first])
+        self.assertTrue(back.has_next())
+
+    def test_invalid_cursor_returns_first_page(self):
+
+        """Некорректный курсор даёт первую страницу."""
+
+        first = self.paginator.get_page()
+        for cursor in ('1', 'garbage', '!!!', 'WyJ4Il0'):
+            with self.subTest(cursor=cursor):
+                page = self.paginator.get_page(cursor)
+                self.assertEqual(list(page), list(first))
+
+    def test_no_count_query(self):
+
+        """Страница получается одним запросом без COUNT."""
+
+        with self.assertNumQueries(1):
+            page = self.paginator.get_page()
+            self.assertEqual(len(page), 10)
+
+    def test_cursor_past_the_end_gives_empty_page(self):
+
+        """Курсор за концом ленты даёт пустую страницу без курсоров."""
+
+        last = Post.objects.order_by('pub_date', 'id').first()
+        cursor = self.paginator.encode(FORWARD, last)
+        page = self.paginator.get_page(cursor)
+        self.assertEqual(list(page), [])
+        self.assertFalse(page.has_next())
+        self.assertIsNone(page.next_cursor())
+        self.assertIsNone(page.previous_cursor())
+
+    def test_stale_cursor_gives_empty_page(self):
+
+        """Курсор из другой ленты или по удалённым постам не ломает
+        страницу, а флаги соседних страниц отражают данные."""
+
+        newest = Post.objects.order_by('-pub_date', '-id').first()
+        cursor = self.paginator.encode(BACKWARD, newest)
+        page = self.paginator.get_page(cursor)
+        self.assertEqual(list(page), [])
+        self.assertFalse(page.has_previous())
+        self.assertTrue(page.has_next())
+        self.assertIsNone(page.previous_cursor())
+        self.assertIsNone(page.next_cursor())
+
+        empty = CursorPaginator(Post.objects.filter(text='nothing'), 10)
+        page = empty.get_page(self.paginator.encode(FORWARD, newest))
+        self.assertEqual(list(page), [])
+        self.assertFalse(page.has_other_pages())
+
+    def test_one_row_previous_page_is_detected(self):
+
+        """Предыдущая страница из одной строки — строки самого курсора —
+        тоже считается."""
+
+        newest = Post.objects.order_by('-pub_date', '-id').first()
+        page = self.paginator.get_page(
+            self.paginator.encode(FORWARD, newest))
+        self.assertEqual(len(page), 10)
+        self.assertTrue(page.has_previous())
+        back = self.paginator.get_page(page.previous_cursor())
+        self.assertEqual(list(back), [newest])
+        self.assertTrue(back.has_next())
+
+    def test_feed_pages_accept_stale_cursors(self):
+
+        """Лента и страница группы с чужим курсором отвечают 200."""
+
+        cache.clear()
+        Group.objects.create(title='g', slug='g', description='d')
+        newest = Post.objects.order_by('-pub_date', '-id').first()
+        for cursor in (self.paginator.encode(FORWARD, newest),
+                       self.paginator.encode(BACKWARD, newest)):
+            for url in (reverse('index'), reverse('group', args=['g'])):
+                with self.subTest(url=url, cursor=cursor):
+                    response = Client().get(url, {'page': cursor})
+                    self.assertEqual(response.status_code, 200)
+
+
+class FeedPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(title='g', slug='g',
+                                         description='d')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.posts = [Post.objects.create(text=f'post {number}',
+                                         author=cls.author, group=cls.group)
+                     for number in range(12)]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_feeds_page_by_cursor(self):
+
+        """Ленты листаются курсорами, а в контексте — стандартные
+        `Page` и `Paginator` без COUNT."""
+
+        newest = [post.id for post in reversed(self.posts)]
+        for url in (reverse('index'), reverse('group', args=['g']),
+                    reverse('profile', args=['author']),
+                    reverse('follow_index')):
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertFalse([query for query in queries.captured_queries
+                                  if 'COUNT(' in query['sql']])
+                page = response.context['page']
+                self.assertIs(type(page), Page)
+                self.assertIs(type(response.context['paginator']),
+                              Paginator)
+                self.assertEqual([post.id for post in page], newest[:10])
+                self.assertTrue(page.has_next())
+                self.assertFalse(page.has_previous())
+                self.assertIsNone(page.previous_cursor())
+
+                response = self.client.get(url,
+                                           {'page': page.next_cursor()})
+                page = response.context['page']
+                self.assertEqual([post.id for post in page], newest[10:])
+                self.assertFalse(page.has_next())
+                self.assertTrue(page.has_previous())
+                self.assertContains(
+                    response, f'?page={page.previous_cursor()}'
+                )
@@ -0,0 +1,69 @@
+import threading
+from unittest import mock
+
+from django.db import connections
+from django.http import Http404
+from django.test import TestCase, override_settings
+
+from posts.models import Post
+from yatube import db_router, parallel, perf
+
+
+def _outside_transaction():
+    # TestCase держит транзакцию, внутри которой gather работает по очереди
+    return mock.patch.object(connections['default'], 'in_atomic_block',
+                             False)
+
+
+@override_settings(VIEW_THREADS=2)
+class GatherTest(TestCase):
+    def test_sequential_inside_transaction(self):
+
+        """Внутри транзакции функции выполняются в потоке запроса."""
+
+        main = threading.get_ident()
+        self.assertEqual(parallel.gather(threading.get_ident,
+                                         threading.get_ident),
+                         [main, main])
+
+    def test_runs_in_pool_keeping_order(self):
+
+        """Вне транзакции функции идут в пул, результаты — по порядку."""
+
+        with _outside_transaction():
+            results = parallel.gather(lambda: 1, threading.get_ident,
+                                      lambda: 3)
+        self.assertEqual(results[0], 1)
+        self.assertNotEqual(results[1], threading.get_ident())
+        self.assertEqual(results[2], 3)
+
+    def test_exception_is_raised(self):
+
+        """Исключение из потока пула пробрасывается во view."""
+
+        def missing():
+            raise Http404
+
+        with _outside_transaction(), self.assertRaises(Http404):
+            parallel.gather(lambda: 1, missing)
+
+    def test_context_is_inherited(self):
+
+        """Потоки пула читают с реплик, как и запрос, и попадают
+        в его замеры."""
+
+        with _outside_transaction(), db_router.replica_reads(True), \
+                perf.measured() as metrics:
+            replicas, _ = parallel.gather(db_router.replica_reads_enabled,
+                                          lambda: Post.objects.exists())
+        self.assertTrue(replicas)
+        self.assertEqual(metrics.queries, 1)
+        self.assertFalse(db_router.replica_reads_enabled())
+
+    @override_settings(VIEW_THREADS=0)
+    def test_disabled(self):
+
+        """VIEW_THREADS=0 выключает пул."""
+
+        with _outside_transaction():
+            self.assertFalse(parallel.enabled())
@@ -0,0 +1,67 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+from yatube import perf
+
+
+class PerformanceMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create(username='author')
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+        Post.objects.create(text='text', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        perf.registry.reset()
+
+    def timing(self, response):
+        return dict(re.findall(r'(\w+);(?:dur=[\d.]+;)?desc="([^"]*)"',
+                               response['Server-Timing']))
+
+    def test_server_timing_header(self):
+
+        """Ответ содержит Server-Timing с SQL, шаблонами и кэшем."""
+
+        response = Client().get(reverse('index'))
+        header = response['Server-Timing']
+        for name in ('app;dur=', 'db;dur=', 'tpl;dur=', 'cache;'):
+            self.assertIn(name, header)
+        self.assertNotEqual(self.timing(response)['db'], '0 queries')
+        self.assertIn('miss=', self.timing(response)['cache'])
+
+        response = Client().get(reverse('index'))
+        self.assertNotIn('hit=0 ', self.timing(response)['cache'])
+
+    def test_histograms_by_url_name(self):
+
+        """Замеры копятся по имени URL."""
+
+        for _ in range(3):
+            Client().get(reverse('index'))
+        Client().get(reverse('profile', args=[self.author.username]))
+        stats = perf.registry.snapshot()
+        self.assertEqual(stats['index']['count'], 3)
+        self.assertEqual(stats['profile']['count'], 1)
+        self.assertGreater(stats['profile']['mean_queries'], 0)
+        self.assertGreater(stats['profile']['mean_template_ms'], 0)
+        self.assertEqual(sum(stats['index']['buckets'].values()), 3)
+
+    def test_stats_endpoint_for_staff_only(self):
+
+        """Гистограммы на /perf/ видны только сотрудникам."""
+
+        url = reverse('perf_stats')
+        self.assertEqual(Client().get(url).status_code, 302)
+        client = Client()
+        client.force_login(self.staff)
+        client.get(reverse('index'))
+        stats = client.get(url).json()
+        self.assertEqual(stats['index']['count'], 1)
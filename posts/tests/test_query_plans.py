@@ -0,0 +1,49 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import query_plans
+from posts.models import Follow, Group, Post
+
+
+class QueryPlansTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(title='group', slug='group',
+                                         description='group')
+        Follow.objects.create(user=User.objects.create(username='reader'),
+                              author=cls.author)
+        cls.post = Post.objects.create(text='котики', author=cls.author,
+                                       group=cls.group)
+
+    def test_feed_queries_use_indexes(self):
+
+        """Запросы лент идут по индексам и не сортируют результат."""
+
+        for name, plan, problems in query_plans.check(self.post):
+            with self.subTest(name):
+                self.assertEqual(problems, [], plan)
+
+    def test_problems_are_detected(self):
+
+        """Полный просмотр и сортировка попадают в отчёт."""
+
+        plan = Post.objects.order_by('text').explain()
+        self.assertTrue(query_plans.problems(plan))
+        self.assertEqual(
+            query_plans.problems('Seq Scan on posts_post', 'postgresql'),
+            ['Seq Scan on posts_post']
+        )
+
+    def test_command(self):
+
+        """Команда explain_feeds проходит на текущей схеме."""
+
+        out = StringIO()
+        call_command('explain_feeds', stdout=out)
+        self.assertIn('индексам', out.getvalue())
@@ -0,0 +1,108 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post, PostTerm
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create(username='author')
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_stemming(self):
+
+        """Разные формы слова приводятся к одной основе."""
+
+        self.assertEqual(search.stem('котики'), search.stem('котиков'))
+        self.assertEqual(search.stem('красивая'), search.stem('красивые'))
+        self.assertEqual(list(search.terms('И в лесу, и в поле')),
+                         [search.stem('лесу'), search.stem('поле')])
+
+    def test_index_follows_post_changes(self):
+
+        """Индекс обновляется при сохранении и удалении поста."""
+
+        post = Post.objects.create(text='Рыжие котики', author=self.author)
+        self.assertEqual(search.ranked_ids('котик'), [post.id])
+
+        post.text = 'Серые собаки'
+        post.save()
+        self.assertEqual(search.ranked_ids('котик'), [])
+        self.assertEqual(search.ranked_ids('собака'), [post.id])
+
+        post.delete()
+        self.assertFalse(PostTerm.objects.exists())
+
+    def test_ranking(self):
+
+        """Выше стоят посты, где больше совпадений с запросом."""
+
+        one = Post.objects.create(text='котики и собаки', author=self.author)
+        both = Post.objects.create(text='рыжие котики, рыжий кот',
+                                   author=self.author)
+        Post.objects.create(text='про собак', author=self.author)
+        self.assertEqual(search.ranked_ids('рыжие котики'), [both.id, one.id])
+
+    def test_ranking_runs_in_database(self):
+
+        """Оценка считается запросом к базе, число постов — из кэша."""
+
+        posts = [Post.objects.create(text='котики ' * (number + 1),
+                                     author=self.author)
+                 for number in range(5)]
+        search.ranked_ids('котики')
+        with self.assertNumQueries(2):
+            ids = search.ranked_ids('котики', limit=2)
+        self.assertEqual(ids, [posts[4].id, posts[3].id])
+
+    def test_rebuild_command(self):
+
+        """Команда перестраивает индекс для всех постов."""
+
+        post = Post.objects.create(text='Котики', author=self.author)
+        PostTerm.objects.all().delete()
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(search.ranked_ids('котики'), [post.id])
+
+    def test_search_page(self):
+
+        """Страница поиска показывает найденные посты постранично."""
+
+        for number in range(12):
+            Post.objects.create(text=f'котики номер {number}',
+                                author=self.author)
+        Post.objects.create(text='собаки', author=self.author)
+        response = Client().get(reverse('search'), {'q': 'котик'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['paginator'].count, 12)
+        self.assertEqual(len(response.context['page'].object_list), 10)
+        response = Client().get(reverse('search'),
+                                {'q': 'котик', 'page': 2})
+        self.assertEqual(len(response.context['page'].object_list), 2)
+        self.assertEqual(Client().get(reverse('search')).status_code, 200)
+
+    def test_admin_search_uses_index(self):
+
+        """Поиск в админке идёт по тому же индексу."""
+
+        post = Post.objects.create(text='Рыжие котики', author=self.author)
+        Post.objects.create(text='Собаки', author=self.author)
+        client = Client()
+        client.force_login(self.admin)
+        response = client.get(reverse('admin:posts_post_changelist'),
+                              {'q': 'котик'})
+        self.assertEqual(list(response.context['cl'].result_list), [post])
@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class StreamingPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.posts = [Post.objects.create(text=f'post {number}',
+                                         author=cls.author, group=cls.group)
+                     for number in range(3)]
+        for number in range(3):
+            Comment.objects.create(post=cls.posts[0], author=cls.author,
+                                   text=f'comment {number}', active=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_same_html_as_regular_render(self):
+
+        """Потоковая страница совпадает с обычной."""
+
+        for url in (reverse('index'), reverse('profile', args=['author']),
+                    reverse('group', args=['group'])):
+            with self.subTest(url=url):
+                regular = Client().get(url)
+                with override_settings(STREAMING_PAGES=True):
+                    streamed = Client().get(url)
+                self.assertTrue(streamed.streaming)
+                self.assertEqual(b''.join(streamed.streaming_content),
+                                 regular.content)
+
+    @override_settings(STREAMING_PAGES=True)
+    def test_head_is_sent_before_comments_are_read(self):
+
+        """Начало страницы поста уходит до запроса за комментариями."""
+
+        response = Client().get(
+            reverse('post', args=['author', self.posts[0].pk])
+        )
+        chunks = iter(response.streaming_content)
+        with CaptureQueriesContext(connection) as queries:
+            head = next(chunks).decode()
+        self.assertEqual(len(queries), 0)
+        self.assertIn('post 0', head)
+        self.assertNotIn('comment 0', head)
+
+        with CaptureQueriesContext(connection) as queries:
+            rest = b''.join(chunks).decode()
+        self.assertEqual(len(queries), 1)
+        for number in range(3):
+            self.assertIn(f'comment {number}', rest)
+        self.assertIn('</html>', rest)
@@ -0,0 +1,146 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from jobs.models import Job
+from jobs.worker import run_pending
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.reader = User.objects.create(username='reader')
+        cls.author = User.objects.create(username='author')
+        cls.other = User.objects.create(username='other')
+
+    def entries(self):
+        return list(TimelineEntry.objects.filter(
+            user=self.reader).values_list('post_id', flat=True))
+
+    def test_new_post_fans_out_to_followers(self):
+
+        """Новый пост попадает в ленты подписчиков автора."""
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='new', author=self.author)
+        Post.objects.create(text='not followed', author=self.other)
+        self.assertEqual(self.entries(), [post.id])
+
+    def test_follow_backfills_and_unfollow_removes(self):
+
+        """Подписка подтягивает старые посты, отписка их убирает."""
+
+        posts = [Post.objects.create(text=f'old {number}', author=self.author)
+                 for number in range(3)]
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(sorted(self.entries()),
+                         sorted(post.id for post in posts))
+
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        self.assertEqual(self.entries(), [])
+
+    def test_deleted_post_leaves_timeline(self):
+
+        """Удалённый пост пропадает из ленты."""
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='to delete', author=self.author)
+        post.delete()
+        self.assertEqual(self.entries(), [])
+
+    @override_settings(TIMELINE_LENGTH=3)
+    def test_timeline_is_trimmed(self):
+
+        """Лента хранит не больше TIMELINE_LENGTH последних записей."""
+
+        posts = [Post.objects.create(text=f'post {number}', author=self.author)
+                 for number in range(5)]
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(sorted(self.entries()),
+                         sorted(post.id for post in posts[-3:]))
+
+    @override_settings(TIMELINE_LENGTH=3, TIMELINE_SLACK=1)
+    def test_fan_out_trims_followers(self):
+
+        """Новые посты обрезают ленту подписчика, только когда она
+        переросла TIMELINE_LENGTH с запасом."""
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        posts = [Post.objects.create(text=f'post {number}', author=self.author)
+                 for number in range(4)]
+        self.assertEqual(len(self.entries()), 4)
+        posts.append(Post.objects.create(text='post 4', author=self.author))
+        self.assertEqual(sorted(self.entries()),
+                         sorted(post.id for post in posts[-3:]))
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.other).count(), 3
+        )
+
+    @override_settings(TIMELINE_INLINE_FOLLOWERS=1)
+    def test_large_audience_is_fanned_out_by_worker(self):
+
+        """Пост автора с большой аудиторией раскладывается задачей."""
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        post = Post.objects.create(text='popular', author=self.author)
+        self.assertEqual(self.entries(), [])
+        self.assertEqual(Job.objects.get().name,
+                         'posts.tasks.fan_out_post')
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(self.entries(), [post.id])
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.other).count(), 1
+        )
+
+    @override_settings(TIMELINE_LENGTH=3)
+    def test_rebuild_inserts_per_batch_of_followers(self):
+
+        """Пересборка заполняет ленты всей пачки подписчиков одним
+        INSERT … SELECT и сразу ограничивает их длину."""
+
+        authors = (self.author, self.other)
+        posts = [Post.objects.create(text=f'post {number}',
+                                     author=authors[number % 2])
+                 for number in range(5)]
+        for author in authors:
+            Follow.objects.create(user=self.reader, author=author)
+        Follow.objects.create(user=self.other, author=self.author)
+        TimelineEntry.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command('rebuild_timelines', stdout=StringIO())
+        inserts = [query for query in queries.captured_queries
+                   if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(sorted(self.entries()),
+                         sorted(post.id for post in posts[-3:]))
+        self.assertEqual(
+            sorted(TimelineEntry.objects.filter(
+                user=self.other).values_list('post_id', flat=True)),
+            [posts[0].id, posts[2].id, posts[4].id],
+        )
+
+    def test_paginator_walks_timeline(self):
+
+        """Лента подписок листается курсорами."""
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [Post.objects.create(text=f'post {number}', author=self.author)
+                 for number in range(5)]
+        paginator = timeline.paginator_for(self.reader, 2)
+        page = paginator.get_page()
+        seen = [post.id for post in page]
+        while page.has_next():
+            page = paginator.get_page(page.next_cursor())
+            seen.extend(post.id for post in page)
+        self.assertEqual(seen, [post.id for post in reversed(posts)])
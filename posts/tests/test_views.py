@@ -1,6 +1,7 @@
 import os
 import shutil
 import tempfile
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -10,6 +11,7 @@ from django.test import Client, TestCase
 from django.urls import reverse
 
 import yatube.settings as st
+from posts import feed_cache
 from posts.models import Comment, Follow, Group, Post
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "hw05_final.settings")
@@ -212,6 +214,42 @@ class TaskPagesTests(TestCase):
         response = self.authorized_client.get(reverse('index'))
         self.assertNotEqual(content, response.content)
 
+    def test_post_delete_bumps_feed_versions(self):
+
+        """Удаление поста после коммита поднимает версии его лент."""
+
+        feeds = (feed_cache.index_feed(),
+                 feed_cache.group_feed(self.group.pk),
+                 feed_cache.profile_feed(self.user.pk))
+        before = feed_cache.versions(*feeds)
+        response = self.authorized_client.get(reverse('index'))
+        self.assertIn(self.post, response.context['page'])
+        with mock.patch('posts.signals.transaction.on_commit',
+                        side_effect=lambda callback: callback()):
+            Post.objects.filter(pk=self.post.pk).delete()
+        after = feed_cache.versions(*feeds)
+        for feed in feeds:
+            with self.subTest(feed=feed):
+                self.assertGreater(after[feed], before[feed])
+        response = self.authorized_client.get(reverse('index'))
+        self.assertNotIn(self.post, response.context['page'])
+
+    def test_index_cache_invalidated_on_post_change(self):
+
+        """Изменение поста сразу видно на закэшированных страницах."""
+
+        urls = (reverse('index'),
+                reverse('group', kwargs={'slug': self.group.slug}),
+                reverse('profile', kwargs={'username': self.user.username}))
+        for url in urls:
+            self.guest_client.get(url)
+        self.post.text = 'Отредактированный текст. ' * 5
+        self.post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertContains(response, self.post.short_text)
+
     def test_following_author(self):
 
         """Новая запись пользователя не появляется в ленте тех,
@@ -281,7 +319,7 @@ class TaskPagesTests(TestCase):
         comments_count = Comment.objects.count()
 
         new_comment = (Comment.objects.create(
-            post=self.post,
+            post=self.post, active=True,
             author=self.user_not_author, text='Ваш пост-не ахти!')).text
 
         response2 = self.authorized_client.get(
@@ -289,3 +327,64 @@ class TaskPagesTests(TestCase):
         get_comment = response2.context['comments'][0].text
         self.assertEqual(Comment.objects.count(), comments_count + 1)
         self.assertEqual(get_comment, new_comment)
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.authors = [User.objects.create(username=f'author-{number}')
+                       for number in range(3)]
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(title='feed-group',
+                                         slug='feed_slug',
+                                         description='feed-description')
+        for number in range(st.PAGINATOR_PAGE_SIZE + 2):
+            author = cls.authors[number % len(cls.authors)]
+            post = Post.objects.create(text=f'feed post {number}',
+                                       author=author, group=cls.group)
+            Comment.objects.create(post=post, author=cls.reader,
+                                   text='comment', active=True)
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feed_page_query_count_does_not_grow(self):
+
+        """Количество запросов ленты не зависит от числа постов."""
+
+        pages = {
+            reverse('index'): 1,
+            reverse('group', kwargs={'slug': self.group.slug}): 3,
+        }
+        for url, queries in pages.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries):
+                    response = self.guest_client.get(url)
+                self.assertEqual(len(response.context['page']),
+                                 st.PAGINATOR_PAGE_SIZE)
+
+    def test_follow_feed_query_count_does_not_grow(self):
+
+        """Лента подписок загружается фиксированным числом запросов."""
+
+        with self.assertNumQueries(4):
+            response = self.reader_client.get(reverse('follow_index'))
+        self.assertEqual(len(response.context['page']),
+                         st.PAGINATOR_PAGE_SIZE)
+
+    def test_feed_annotates_comment_count(self):
+
+        """Число комментариев приходит вместе с постом."""
+
+        post = Post.objects.for_feed().first()
+        with self.assertNumQueries(0):
+            self.assertEqual(post.comment_count, 1)
+            self.assertEqual(post.group.slug, self.group.slug)
+            self.assertIn(post.author, self.authors)
@@ -0,0 +1,116 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import counters, write_behind
+from posts.models import Comment, Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class WriteBehindTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        cls.settings = override_settings(
+            WRITE_BEHIND=True,
+            WRITE_BEHIND_PATH=os.path.join(cls.directory, 'writes.sqlite3'),
+        )
+        cls.settings.enable()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='post', author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        shutil.rmtree(cls.directory)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        write_behind._db().execute('DELETE FROM writes')
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_follow_is_deferred_and_visible_to_follower(self):
+
+        """Подписка откладывается, но подписчик сразу видит её."""
+
+        self.client.get(reverse('profile_follow', args=['author']))
+        self.assertFalse(Follow.objects.exists())
+        response = self.client.get(reverse('profile', args=['author']))
+        self.assertTrue(response.context['following'])
+
+        self.assertEqual(write_behind.flush(), 1)
+        self.assertTrue(Follow.objects.filter(user=self.reader,
+                                              author=self.author).exists())
+        self.assertEqual(counters.stats_for(self.author).followers_count, 1)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.post).exists())
+        self.assertEqual(write_behind.pending(), 0)
+        # буфер пуст, ответ теперь даёт граф подписок
+        response = self.client.get(reverse('profile', args=['author']))
+        self.assertTrue(response.context['following'])
+
+    def test_toggles_are_coalesced(self):
+
+        """Из нескольких нажатий в пачке применяется последнее."""
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.get(reverse('profile_unfollow', args=['author']))
+        response = self.client.get(reverse('profile', args=['author']))
+        self.assertFalse(response.context['following'])
+        self.client.get(reverse('profile_follow', args=['author']))
+        self.client.get(reverse('profile_unfollow', args=['author']))
+
+        with mock.patch.object(Follow.objects, 'bulk_create') as create:
+            self.assertEqual(write_behind.flush(), 3)
+        create.assert_called_once()
+        self.assertFalse(Follow.objects.exists())
+
+    def test_comment_is_deferred_and_shown_to_author(self):
+
+        """Комментарий откладывается, автор видит его на странице поста."""
+
+        self.client.post(reverse('add_comment', args=['author', self.post.pk]),
+                         {'text': 'deferred'})
+        self.assertFalse(Comment.objects.exists())
+        url = reverse('post', args=['author', self.post.pk])
+        pending = self.client.get(url).context['pending_comments']
+        self.assertEqual([comment.text for comment in pending], ['deferred'])
+        self.assertEqual(Client().get(url).context['pending_comments'], [])
+
+        call_command('flush_writes', once=True, stdout=StringIO())
+        comment = Comment.objects.get()
+        self.assertEqual((comment.text, comment.author, comment.active),
+                         ('deferred', self.reader, False))
+        self.assertEqual(comment.token, pending[0].token)
+        # комментарий ждёт модерации и в счётчик не входит
+        self.assertEqual(Post.objects.get().comment_count, 0)
+
+    def test_replayed_batch_creates_no_duplicates(self):
+
+        """Пачку, прерванную после коммита, можно перенести повторно."""
+
+        comment = Comment(post=self.post, author=self.reader, text='once')
+        write_behind.add_comment(comment)
+        write_behind.follow(self.reader, self.author)
+        with mock.patch.object(write_behind, '_release'):
+            write_behind.flush()
+        # срок захвата истёк
+        write_behind._db().execute('UPDATE writes SET claimed_until = 0')
+        self.assertEqual(write_behind.flush(), 2)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(Post.objects.get().comment_count, 0)
+        self.assertEqual(counters.stats_for(self.reader).following_count, 1)
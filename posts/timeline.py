@@ -0,0 +1,160 @@
+"""Лента подписок, материализованная при записи (fan-out on write).
+
+Каждый новый пост раскладывается в `TimelineEntry` всех подписчиков
+автора, поэтому чтение ленты — один проход по индексу
+`(user, -pub_date, -post)` вместо join через `Follow`.
+
+Подписчиков немного (не больше TIMELINE_INLINE_FOLLOWERS) — пост
+раскладывается сразу в запросе, иначе — задачей очереди `jobs`, чтобы
+публикация не ждала, пока пост дойдёт до всей аудитории. Ленты
+обрезаются, только когда переросли TIMELINE_LENGTH на
+TIMELINE_SLACK записей.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count
+
+from . import chunked
+from .models import Follow, Post, TimelineEntry
+from .paginator import CursorPaginator
+
+BATCH_SIZE = 1000
+# старый SQLite принимает не больше 999 параметров в запросе
+USER_BATCH_SIZE = 500
+
+
+def _length():
+    return getattr(settings, 'TIMELINE_LENGTH', 1000)
+
+
+def _slack():
+    return getattr(settings, 'TIMELINE_SLACK', 100)
+
+
+def fan_out_inline(author_id):
+    """Хватит ли аудитории автора раскладки прямо в запросе: проверка
+    одной строки за порогом вместо COUNT."""
+    inline = getattr(settings, 'TIMELINE_INLINE_FOLLOWERS', 100)
+    return not Follow.objects.filter(
+        author_id=author_id
+    ).values('pk')[inline:inline + 1].exists()
+
+
+def fan_out(post):
+    """Добавить пост в ленты всех подписчиков автора; обрезать те, что
+    переросли длину с запасом."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('pk', 'user_id')
+    for batch in chunked.row_batches(followers, BATCH_SIZE):
+        user_ids = [user_id for _, user_id in batch]
+        TimelineEntry.objects.bulk_create(
+            (TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+             for user_id in user_ids),
+            ignore_conflicts=True,
+        )
+        trim(*_overgrown(user_ids))
+
+
+def _overgrown(user_ids):
+    """Те из пользователей, чьи ленты длиннее TIMELINE_LENGTH больше
+    чем на TIMELINE_SLACK записей."""
+    limit = _length() + _slack()
+    overgrown = []
+    for start in range(0, len(user_ids), USER_BATCH_SIZE):
+        overgrown.extend(TimelineEntry.objects.filter(
+            user_id__in=user_ids[start:start + USER_BATCH_SIZE]
+        ).order_by().values('user_id').annotate(
+            total=Count('id')
+        ).filter(total__gt=limit).values_list('user_id', flat=True))
+    return overgrown
+
+
+def backfill(user_id, author_id):
+    """Подтянуть последние посты автора в ленту нового подписчика."""
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id'
+    ).values_list('id', 'pub_date')[:_length()]
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim(user_id)
+
+
+def fill(*user_ids):
+    """Собрать пустые ленты пользователей из их подписок — одним
+    INSERT … SELECT на пачку пользователей, сразу не длиннее
+    TIMELINE_LENGTH записей."""
+    quote = connection.ops.quote_name
+    table = quote(TimelineEntry._meta.db_table)
+    follows = quote(Follow._meta.db_table)
+    posts = quote(Post._meta.db_table)
+    for start in range(0, len(user_ids), USER_BATCH_SIZE):
+        batch = user_ids[start:start + USER_BATCH_SIZE]
+        placeholders = ', '.join(['%s'] * len(batch))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (user_id, post_id, pub_date)'
+                f' SELECT user_id, post_id, pub_date FROM ('
+                f'SELECT f.user_id, p.id AS post_id, p.pub_date,'
+                f' ROW_NUMBER() OVER (PARTITION BY f.user_id'
+                f' ORDER BY p.pub_date DESC, p.id DESC) AS position'
+                f' FROM {follows} f JOIN {posts} p'
+                f' ON p.author_id = f.author_id'
+                f' WHERE f.user_id IN ({placeholders})) ranked'
+                f' WHERE position <= %s',
+                [*batch, _length()],
+            )
+
+
+def remove_author(user_id, author_id):
+    """Убрать посты автора из ленты отписавшегося пользователя."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def trim(*user_ids):
+    """Оставить в лентах пользователей не более TIMELINE_LENGTH последних
+    записей — одним DELETE на всю пачку пользователей."""
+    table = connection.ops.quote_name(TimelineEntry._meta.db_table)
+    for start in range(0, len(user_ids), USER_BATCH_SIZE):
+        batch = user_ids[start:start + USER_BATCH_SIZE]
+        placeholders = ', '.join(['%s'] * len(batch))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE id IN ('
+                f'SELECT id FROM (SELECT id, ROW_NUMBER() OVER ('
+                f'PARTITION BY user_id ORDER BY pub_date DESC, post_id DESC'
+                f') AS position FROM {table}'
+                f' WHERE user_id IN ({placeholders})) ranked'
+                f' WHERE position > %s)',
+                [*batch, _length()],
+            )
+
+
+def _loader(queryset):
+    def load(entries):
+        ids = [entry.post_id for entry in entries]
+        posts = queryset.in_bulk(ids)
+        return [posts[post_id] for post_id in ids if post_id in posts]
+    return load
+
+
+def paginator_for(user, per_page, posts=None):
+    """Постраничная лента подписок пользователя.
+
+    Посты страницы читаются из `posts` (по умолчанию
+    `Post.objects.for_feed()`), так API выбирает только нужные колонки.
+    """
+    if posts is None:
+        posts = Post.objects.for_feed()
+    return CursorPaginator(
+        TimelineEntry.objects.filter(user=user),
+        per_page,
+        ordering=('-pub_date', '-post_id'),
+        transform=_loader(posts),
+    )
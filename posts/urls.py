@@ -5,9 +5,12 @@ from . import views
 urlpatterns = [
 
     path('', views.index, name='index'),
+    path('group/', views.group_list, name='groups'),
     path('group/<slug:slug>/', views.group_posts, name='group'),
     path('new/', views.new_post, name='new'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search_posts, name='search'),
+    path('moderation/', views.moderation_queue, name='moderation'),
     path('delete/<post_id>', views.delete_post, name='delete'),
     path(
         '<str:username>/follow/',
@@ -21,6 +24,10 @@ urlpatterns = [
         '<str:username>/<int:post_id>/edit/',
         views.post_edit,
         name='post_edit'),
+    path(
+        '<str:username>/<int:post_id>/comments/',
+        views.comments,
+        name='comments'),
     path(
         '<str:username>/<int:post_id>/comment/',
         views.add_comment,
@@ -1,3 +1,6 @@
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
@@ -5,78 +8,221 @@ from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.cache import cache_page
 
 import yatube.settings as st
+from yatube import parallel
+from . import (conditional, counters, feed_cache, follow_graph, groups,
+               moderation, search, streaming, tasks, timeline, write_behind)
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
+from .models import Comment, Post
+from .paginator import CursorPaginator, as_django_page
 
 User = get_user_model()
 
 
+def _page_context(page):
+    """`page` и `paginator` для шаблонов — стандартные классы Django."""
+    page = as_django_page(page)
+    return {'page': page, 'paginator': page.paginator}
+
+
 def index(request):
-    posts = Post.objects.all()
-    paginator = Paginator(posts, st.PAGINATOR_PAGE_SIZE)
+    posts = Post.objects.for_feed()
+    paginator = CursorPaginator(posts, st.PAGINATOR_PAGE_SIZE)
 
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    context = {'page': page, 'paginator': paginator}
+    cursor = request.GET.get('page')
+    page = feed_cache.get_page(feed_cache.index_feed(), paginator, cursor)
+    feed_cache.attach_versions(page.object_list)
+    context = _page_context(page)
 
-    return render(
+    etag = conditional.page_etag(request, page)
+    return conditional.respond(request, etag, lambda: streaming.render(
         request,
         'index.html',
         context
-    )
+    ))
 
 
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, st.PAGINATOR_PAGE_SIZE)
-
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    group = groups.by_slug(slug)
+    paginator = groups.paginator(group)
+    posts = paginator.object_list
+
+    cursor = request.GET.get('page')
+    page, post_count = parallel.gather(
+        lambda: feed_cache.get_page(feed_cache.group_feed(group.pk),
+                                    paginator, cursor),
+        lambda: groups.post_count(group),
+    )
+    feed_cache.attach_versions(page.object_list)
 
-    return render(
+    etag = conditional.page_etag(request, page, group.title,
+                                 group.description, post_count)
+    return conditional.respond(request, etag, lambda: streaming.render(
         request,
         'group.html',
-        {'group': group, 'page': page, 'paginator': paginator, 'posts': posts}
+        {'group': group, 'posts': posts, 'post_count': post_count,
+         **_page_context(page)}
+    ))
+
+
+def group_list(request):
+    paginator = Paginator(groups.directory(), st.PAGINATOR_PAGE_SIZE)
+    page = paginator.get_page(request.GET.get('page'))
+    return render(request, 'groups.html',
+                  {'page': page, 'paginator': paginator})
+
+
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(search.ranked_ids(query) if query else [],
+                          st.PAGINATOR_PAGE_SIZE)
+    page = paginator.get_page(request.GET.get('page'))
+    page.object_list = search.posts(page.object_list)
+    feed_cache.attach_versions(page.object_list)
+    return streaming.render(
+        request,
+        'search.html',
+        {'query': query, 'page': page, 'paginator': paginator}
     )
 
 
 # @cache_page(20)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user, author=author
-    ).exists()
-    post_count = posts.count()
-    paginator = Paginator(posts, st.PAGINATOR_PAGE_SIZE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    posts = author.posts.for_feed()
+    paginator = CursorPaginator(posts, st.PAGINATOR_PAGE_SIZE)
+    cursor = request.GET.get('page')
+    following, stats, page = parallel.gather(
+        lambda: follow_graph.follows(request.user, author),
+        lambda: counters.stats_for(author),
+        lambda: feed_cache.get_page(feed_cache.profile_feed(author.pk),
+                                    paginator, cursor),
+    )
+    pending = write_behind.following(request.user, author)
+    if pending is not None:
+        following = pending
+    feed_cache.attach_versions(page.object_list)
     context = {'author': author,
-               'page': page,
                'following': following,
                'profile': True,
-               'paginator': paginator,
-               'post_count': post_count}
-    return render(request, 'profile.html', context)
+               'stats': stats,
+               'post_count': stats.posts_count,
+               **_page_context(page)}
+    etag = conditional.page_etag(
+        request, page, author.username, author.get_full_name(), following,
+        stats.posts_count, stats.followers_count, stats.following_count,
+    )
+    return conditional.respond(request, etag, lambda: streaming.render(
+        request, 'profile.html', context
+    ))
 
 
 def post_view(request, username, post_id):
     form = CommentForm(request.POST or None)
-    author = get_object_or_404(User, username=username)
-    post = get_object_or_404(Post, id=post_id, author__username=username)
-    posts = author.posts.all()
-    post_count = posts.count()
-    comments = post.comments.all()
+    # карточка поста кэшируется под его версией, поэтому сам пост —
+    # с основной базы (см. db_router.primary_reads)
+    author, post = parallel.gather(
+        lambda: get_object_or_404(User, username=username),
+        lambda: get_object_or_404(
+            Post.objects.using('default').for_feed(),
+            id=post_id, author__username=username,
+        ),
+    )
+    cursor = request.GET.get('comments')
+    stats, comments_page, _ = parallel.gather(
+        lambda: counters.stats_for(author),
+        lambda: _comments_paginator(post).get_page(cursor),
+        lambda: feed_cache.attach_versions([post]),
+    )
+    pending_comments = write_behind.pending_comments(request.user, post)
     context = {
-        'post_count': post_count,
+        'stats': stats,
+        'post_count': stats.posts_count,
         'post': post,
         'author': author,
         'form': form,
         'post_view': True,
-        'comments': comments
+        'comments': comments_page.object_list,
+        'comments_page': comments_page,
+        'pending_comments': pending_comments,
     }
-    return render(request, 'post.html', context)
+    etag = conditional.make_etag(
+        request, post.pk, post.card_version, author.get_full_name(),
+        stats.posts_count, stats.followers_count, stats.following_count,
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME), cursor,
+        *(comment.token for comment in pending_comments),
+    )
+    return conditional.respond(request, etag, lambda: streaming.render(
+        request, 'post.html', context
+    ))
+
+
+def _with_authors(rows):
+    return Comment.objects.filter(
+        pk__in=[row.pk for row in rows]
+    ).select_related('author').order_by('created', 'id')
+
+
+def _comments_paginator(post):
+    """Одобренные комментарии порциями: ключи страницы узким запросом,
+    затем сами комментарии с авторами."""
+    visible = Comment.objects.visible().filter(post=post)
+    return CursorPaginator(visible.only('id', 'created'),
+                           settings.COMMENTS_PAGE_SIZE,
+                           ordering=('created', 'id'),
+                           transform=_with_authors)
+
+
+def comments(request, username, post_id):
+    """Следующая порция комментариев без страницы вокруг."""
+    post = get_object_or_404(Post.objects.select_related('author'),
+                             id=post_id, author__username=username)
+    page = _comments_paginator(post).get_page(request.GET.get('cursor'))
+    return render(request, 'includes/comment_list.html', {
+        'post': post,
+        'author': post.author,
+        'comments': page.object_list,
+        'comments_page': page,
+    })
+
+
+def _ids(values):
+    """Целые id из формы; некорректные значения отбрасываются."""
+    ids = []
+    for value in values:
+        try:
+            ids.append(int(value))
+        except ValueError:
+            continue
+    return ids
+
+
+@staff_member_required
+def moderation_queue(request):
+    """Ждущие одобрения комментарии, старые первыми."""
+    if request.method == 'POST':
+        selected = Comment.objects.pending()
+        if not request.POST.get('all'):
+            selected = selected.filter(
+                pk__in=_ids(request.POST.getlist('comment'))
+            )
+        action = request.POST.get('action')
+        if action == 'approve':
+            count = moderation.approve(selected)
+            messages.success(request, f'Одобрено: {count}')
+        elif action == 'reject':
+            count = moderation.delete(selected)
+            messages.success(request, f'Отклонено: {count}')
+        return redirect(request.get_full_path())
+
+    paginator = CursorPaginator(
+        Comment.objects.pending().select_related('author', 'post__author'),
+        st.PAGINATOR_PAGE_SIZE, ordering=('created', 'id'),
+    )
+    page = paginator.get_page(request.GET.get('page'))
+    return render(request, 'moderation.html', {
+        'pending_count': moderation.pending_count(),
+        **_page_context(page),
+    })
 
 
 def delete_post(request, post_id=None):
@@ -93,6 +239,8 @@ def new_post(request):
         new_form = form.save(commit=False)
         new_form.author = request.user
         new_form.save()
+        if 'image' in form.changed_data:
+            tasks.build_image_variants.enqueue(new_form.pk)
         return redirect('index')
 
     return render(request, 'new.html', {'form': form})
@@ -110,7 +258,12 @@ def post_edit(request, username, post_id):
     if not form.is_valid():
         return render(request, 'new.html', {'form': form, 'post': post})
 
+    if 'image' in form.changed_data:
+        # копии старой картинки не показываем, пока не готовы новые
+        post.image_variants = ''
     form.save()
+    if 'image' in form.changed_data:
+        tasks.build_image_variants.enqueue(post.pk)
     return redirect('post', post.author, post_id)
 
 
@@ -122,23 +275,22 @@ def add_comment(request, username, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        write_behind.add_comment(comment)
     return redirect('post', username, post_id)
 
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, st.PAGINATOR_PAGE_SIZE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(
+    paginator = timeline.paginator_for(request.user, st.PAGINATOR_PAGE_SIZE)
+    cursor = request.GET.get('page')
+    page = paginator.get_page(cursor)
+    feed_cache.attach_versions(page.object_list)
+    return streaming.render(
         request,
         'follow.html',
         {
-            'posts': posts,
-            'paginator': paginator,
-            'page': page,
+            'posts': page.object_list,
+            **_page_context(page),
         }
     )
 
@@ -147,15 +299,14 @@ def follow_index(request):
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
-        Follow.objects.get_or_create(author=author, user=request.user)
+        write_behind.follow(request.user, author)
     return redirect('profile', username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    Follow.objects.filter(
-        author__username=username,
-        user=request.user).delete()
+    author = get_object_or_404(User, username=username)
+    write_behind.unfollow(request.user, author)
     return redirect('profile', username)
 
 
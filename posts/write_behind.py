@@ -0,0 +1,268 @@
+"""Отложенная запись подписок и комментариев (write-behind).
+
+При всплеске активности (комментарии к популярному посту, волна
+подписок) каждый запрос ждёт блокировку основной базы. С WRITE_BEHIND
+view кладёт действие в локальный файл SQLite (`WRITE_BEHIND_PATH`)
+и сразу отвечает, а `manage.py flush_writes` короткими пачками переносит
+накопленное в базу: подписки — одним `bulk_create` и удалением,
+комментарии — одним `bulk_create`. Сигналы при этом не срабатывают,
+счётчики и ленты обновляются здесь же, по разу на пользователя и пост.
+
+Пачка сначала захватывается на `LEASE` секунд и удаляется из буфера
+только после коммита в базу. Если перенос прервался, пачку повторят,
+и дубликатов не будет: подписки сверяются с уже существующими
+(ограничение `following_unique`), комментарии — по уникальному `token`.
+Пока действие не перенесено, его автор видит его поверх данных базы.
+"""
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from . import bulk, counters, feed_cache, follow_graph, moderation, timeline
+from .models import Comment, Follow, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+LEASE = 60
+
+FOLLOW = 'follow'
+UNFOLLOW = 'unfollow'
+COMMENT = 'comment'
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS writes ('
+    ' id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL,'
+    ' user_id INTEGER NOT NULL, target_id INTEGER NOT NULL,'
+    ' text TEXT, token TEXT, created REAL NOT NULL,'
+    ' claimed_until REAL NOT NULL DEFAULT 0)',
+    'CREATE INDEX IF NOT EXISTS writes_user '
+    'ON writes (user_id, target_id, kind)',
+)
+
+_local = threading.local()
+
+
+def enabled():
+    return getattr(settings, 'WRITE_BEHIND', False)
+
+
+def _path():
+    return getattr(settings, 'WRITE_BEHIND_PATH',
+                   os.path.join(settings.BASE_DIR, 'writes.sqlite3'))
+
+
+def _db():
+    key = (os.getpid(), _path())
+    if getattr(_local, 'key', None) != key:
+        directory = os.path.dirname(key[1])
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(key[1], timeout=30,
+                                     isolation_level=None,
+                                     check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        # действие пользователя уже подтверждено ответом, поэтому
+        # буфер должен пережить падение сервера
+        connection.execute('PRAGMA synchronous=FULL')
+        for statement in SCHEMA:
+            connection.execute(statement)
+        _local.connection = connection
+        _local.key = key
+    return _local.connection
+
+
+def _append(kind, user_id, target_id, text=None, token=None):
+    _db().execute(
+        'INSERT INTO writes (kind, user_id, target_id, text, token, created)'
+        ' VALUES (?, ?, ?, ?, ?, ?)',
+        (kind, user_id, target_id, text, token, time.time()),
+    )
+
+
+def follow(user, author):
+    if not enabled():
+        Follow.objects.get_or_create(user=user, author=author)
+        return
+    _append(FOLLOW, user.pk, author.pk)
+
+
+def unfollow(user, author):
+    if not enabled():
+        Follow.objects.filter(user=user, author=author).delete()
+        return
+    _append(UNFOLLOW, user.pk, author.pk)
+
+
+def add_comment(comment):
+    """Сохранить несохранённый комментарий сейчас или отложить."""
+    if not enabled():
+        comment.save()
+        return
+    comment.token = uuid.uuid4()
+    _append(COMMENT, comment.author_id, comment.post_id, comment.text,
+            str(comment.token))
+
+
+def following(user, author):
+    """Последнее неперенесённое действие: True, False или None."""
+    if not enabled() or not user.is_authenticated:
+        return None
+    row = _db().execute(
+        'SELECT kind FROM writes WHERE user_id = ? AND target_id = ?'
+        ' AND kind IN (?, ?) ORDER BY id DESC LIMIT 1',
+        (user.pk, author.pk, FOLLOW, UNFOLLOW),
+    ).fetchone()
+    return None if row is None else row[0] == FOLLOW
+
+
+def pending_comments(user, post):
+    """Неперенесённые комментарии пользователя к посту."""
+    if not enabled() or not user.is_authenticated:
+        return []
+    rows = _db().execute(
+        'SELECT text, token, created FROM writes WHERE user_id = ?'
+        ' AND target_id = ? AND kind = ? ORDER BY id',
+        (user.pk, post.pk, COMMENT),
+    )
+    return [
+        Comment(post=post, author=user, text=text, token=uuid.UUID(token),
+                created=datetime.fromtimestamp(created, timezone.utc))
+        for text, token, created in rows
+    ]
+
+
+def pending():
+    return _db().execute('SELECT COUNT(*) FROM writes').fetchone()[0]
+
+
+def claim(limit=BATCH_SIZE):
+    """Захватить до `limit` самых старых действий на LEASE секунд."""
+    db = _db()
+    now = time.time()
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        rows = db.execute(
+            'SELECT id, kind, user_id, target_id, text, token, created'
+            ' FROM writes WHERE claimed_until < ? ORDER BY id LIMIT ?',
+            (now, limit),
+        ).fetchall()
+        db.executemany('UPDATE writes SET claimed_until = ? WHERE id = ?',
+                       ((now + LEASE, row[0]) for row in rows))
+    except BaseException:
+        db.execute('ROLLBACK')
+        raise
+    db.execute('COMMIT')
+    return rows
+
+
+def _release(rows):
+    db = _db()
+    db.execute('BEGIN IMMEDIATE')
+    db.executemany('DELETE FROM writes WHERE id = ?',
+                   ((row[0],) for row in rows))
+    db.execute('COMMIT')
+
+
+def flush(limit=BATCH_SIZE):
+    """Перенести одну пачку в базу; вернуть число действий в ней."""
+    rows = claim(limit)
+    if not rows:
+        return 0
+    follows = [row for row in rows if row[1] in (FOLLOW, UNFOLLOW)]
+    comments = [row for row in rows if row[1] == COMMENT]
+    with transaction.atomic():
+        _flush_follows(follows)
+        _flush_comments(comments)
+    _release(rows)
+    return len(rows)
+
+
+def _existing_users(ids):
+    return set(User.objects.filter(pk__in=ids).values_list('pk', flat=True))
+
+
+def _flush_follows(rows):
+    # из нескольких нажатий на одну пару важно только последнее
+    state = {}
+    for _, kind, user_id, author_id, *_ in rows:
+        if user_id != author_id:
+            state[user_id, author_id] = kind == FOLLOW
+    if not state:
+        return
+    users = _existing_users({user for pair in state for user in pair})
+    by_user = defaultdict(list)
+    for user_id, author_id in state:
+        by_user[user_id].append(author_id)
+    existing = set()
+    for user_id, authors in by_user.items():
+        existing.update(Follow.objects.filter(
+            user_id=user_id, author_id__in=authors
+        ).values_list('user_id', 'author_id'))
+
+    created = [pair for pair, wanted in state.items()
+               if wanted and pair not in existing
+               and pair[0] in users and pair[1] in users]
+    Follow.objects.bulk_create(
+        (Follow(user_id=user_id, author_id=author_id)
+         for user_id, author_id in created),
+        ignore_conflicts=True,
+    )
+    followers = Counter(author_id for _, author_id in created)
+    subscriptions = Counter(user_id for user_id, _ in created)
+    for author_id, count in followers.items():
+        counters.bump_user(author_id, 'followers_count', count)
+    for user_id, count in subscriptions.items():
+        counters.bump_user(user_id, 'following_count', count)
+    for user_id, author_id in created:
+        timeline.backfill(user_id, author_id)
+    if subscriptions:
+        follow_graph.changed(*subscriptions)
+
+    removed = defaultdict(list)
+    for (user_id, author_id), wanted in state.items():
+        if not wanted and (user_id, author_id) in existing:
+            removed[user_id].append(author_id)
+    for user_id, authors in removed.items():
+        # удаление через ORM: счётчики и ленты поправят сигналы
+        Follow.objects.filter(user_id=user_id,
+                              author_id__in=authors).delete()
+
+
+def _flush_comments(rows):
+    if not rows:
+        return
+    tokens = [uuid.UUID(row[5]) for row in rows]
+    seen = set(Comment.objects.filter(
+        token__in=tokens
+    ).values_list('token', flat=True))
+    posts = {post['id']: post for post in Post.objects.filter(
+        pk__in={row[3] for row in rows}
+    ).values('id', 'author_id', 'group_id')}
+    users = _existing_users({row[2] for row in rows})
+
+    created = [
+        Comment(post_id=post_id, author_id=user_id, text=text, token=token,
+                created=datetime.fromtimestamp(timestamp, timezone.utc))
+        for (_, _, user_id, post_id, text, _, timestamp), token
+        in zip(rows, tokens)
+        if token not in seen and post_id in posts and user_id in users
+    ]
+    bulk.insert(Comment, created)
+    visible = Counter(c.post_id for c in created if c.active)
+    for post_id in {c.post_id for c in created}:
+        post = posts[post_id]
+        if visible[post_id]:
+            counters.bump_comments(post_id, visible[post_id])
+        feed_cache.post_changed(post_id, post['author_id'], post['group_id'])
+    if created:
+        moderation.queue_changed()
@@ -0,0 +1,305 @@
+"""Кэш в SQLite-файле, общий для всех процессов на одном сервере.
+
+В отличие от LocMemCache каждый воркер gunicorn видит одни и те же
+записи, поэтому фрагменты не дублируются в памяти и процент попаданий
+не делится на число воркеров. Объём ограничен по числу записей
+(`MAX_ENTRIES`) и по суммарному размеру (`MAX_BYTES`); при переполнении
+вытесняются давно не читавшиеся записи (LRU).
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends import locmem
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import perf
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL,'
+    ' accessed REAL NOT NULL, size INTEGER NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE TABLE IF NOT EXISTS totals ('
+    ' name TEXT PRIMARY KEY, value INTEGER NOT NULL)',
+)
+TOTALS = ('entries', 'bytes', 'hits', 'misses', 'sets', 'evictions')
+PENDING = ('hits', 'misses', 'sets')
+MISSING = object()
+
+
+class InstrumentedCacheMixin:
+    """Сообщает yatube.perf о попаданиях и промахах."""
+
+    def get(self, key, default=None, version=None):
+        with perf.paused():
+            value = super().get(key, MISSING, version=version)
+        perf.record_cache(*((0, 1) if value is MISSING else (1, 0)))
+        return default if value is MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        with perf.paused():
+            found = super().get_many(keys, version=version)
+        perf.record_cache(len(found), len(keys) - len(found))
+        return found
+
+
+class LocMemCache(InstrumentedCacheMixin, locmem.LocMemCache):
+    pass
+
+
+class SQLiteCache(InstrumentedCacheMixin, BaseCache):
+    """Кэш-бэкенд Django поверх одного файла SQLite в режиме WAL.
+
+    Параметры OPTIONS:
+    MAX_ENTRIES — предел числа записей (как у остальных бэкендов);
+    MAX_BYTES — предел суммарного размера значений, 0 — без предела;
+    CULL_FREQUENCY — при переполнении удаляется 1/CULL_FREQUENCY записей;
+    ACCESS_RESOLUTION — как часто (в секундах) обновлять время чтения,
+    чтобы каждое попадание не было записью в базу;
+    STATS_FLUSH_EVERY — через сколько операций сбрасывать статистику.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_bytes = int(options.get('MAX_BYTES', 0))
+        self._access_resolution = float(options.get('ACCESS_RESOLUTION', 10))
+        self._flush_every = int(options.get('STATS_FLUSH_EVERY', 100))
+        self._local = threading.local()
+        self._pending = dict.fromkeys(PENDING, 0)
+        self._pending_lock = threading.Lock()
+
+    @property
+    def _db(self):
+        if getattr(self._local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self._path, timeout=30,
+                                         isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            connection.executemany(
+                'INSERT OR IGNORE INTO totals (name, value) VALUES (?, 0)',
+                ((name,) for name in TOTALS),
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def _count(self, name, amount=1):
+        with self._pending_lock:
+            self._pending[name] += amount
+            pending = sum(self._pending.values())
+        if pending >= self._flush_every:
+            self._flush_stats()
+
+    def _flush_stats(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, dict.fromkeys(PENDING, 0)
+        self._db.executemany(
+            'UPDATE totals SET value = value + ? WHERE name = ?',
+            ((value, name) for name, value in pending.items() if value),
+        )
+
+    def _fetch(self, keys):
+        now = time.time()
+        found = {}
+        stale = []
+        placeholders = ','.join('?' * len(keys))
+        rows = self._db.execute(
+            f'SELECT key, value, expires, accessed FROM cache '
+            f'WHERE key IN ({placeholders})', keys,
+        ).fetchall()
+        for key, value, expires, accessed in rows:
+            if expires is not None and expires <= now:
+                continue
+            found[key] = pickle.loads(value)
+            if now - accessed > self._access_resolution:
+                stale.append((now, key))
+        if stale:
+            self._db.executemany(
+                'UPDATE cache SET accessed = ? WHERE key = ?', stale)
+        self._count('hits', len(found))
+        self._count('misses', len(keys) - len(found))
+        return found
+
+    def _store(self, key, value, timeout, mode):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute('SELECT expires, size FROM cache WHERE key = ?',
+                             (key,)).fetchone()
+            alive = row is not None and (row[0] is None or row[0] > now)
+            if mode == 'add' and alive:
+                db.execute('COMMIT')
+                return False
+            entries, size = 1, len(data)
+            if row is not None:
+                entries, size = 0, len(data) - row[1]
+            db.execute(
+                'INSERT OR REPLACE INTO cache '
+                '(key, value, expires, accessed, size) VALUES (?, ?, ?, ?, ?)',
+                (key, data, self.get_backend_timeout(timeout), now, len(data)),
+            )
+            self._add_totals(entries=entries, bytes=size)
+            self._cull()
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        self._count('sets')
+        return True
+
+    def _add_totals(self, **deltas):
+        self._db.executemany(
+            'UPDATE totals SET value = value + ? WHERE name = ?',
+            ((value, name) for name, value in deltas.items() if value),
+        )
+
+    def _totals(self):
+        return dict(self._db.execute('SELECT name, value FROM totals'))
+
+    def _cull(self):
+        totals = self._totals()
+        entries, size = totals['entries'], totals['bytes']
+        drop = 0
+        if entries > self._max_entries:
+            drop = max(1, entries // self._cull_frequency)
+        if not drop and not (self._max_bytes and size > self._max_bytes):
+            return
+        db = self._db
+        now = time.time()
+        victims = db.execute(
+            'SELECT key, size FROM cache '
+            'WHERE expires IS NOT NULL AND expires <= ?', (now,),
+        ).fetchall()
+        drop -= len(victims)
+        size -= sum(victim_size for _, victim_size in victims)
+        oldest = db.execute(
+            'SELECT key, size FROM cache '
+            'WHERE expires IS NULL OR expires > ? ORDER BY accessed', (now,),
+        )
+        for key, victim_size in oldest:
+            if drop <= 0 and not (self._max_bytes and size > self._max_bytes):
+                break
+            victims.append((key, victim_size))
+            drop -= 1
+            size -= victim_size
+        oldest.close()
+        db.executemany('DELETE FROM cache WHERE key = ?',
+                       ((key,) for key, _ in victims))
+        self._add_totals(
+            entries=-len(victims),
+            bytes=-sum(victim_size for _, victim_size in victims),
+            evictions=len(victims),
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._store(key, value, timeout, 'add')
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._fetch([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        made = {self.make_key(key, version=version): key for key in keys}
+        for key in made:
+            self.validate_key(key)
+        found = self._fetch(list(made))
+        return {made[key]: value for key, value in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._store(key, value, timeout, 'set')
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        cursor = self._db.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute('SELECT size FROM cache WHERE key = ?',
+                             (key,)).fetchone()
+            if row is not None:
+                db.execute('DELETE FROM cache WHERE key = ?', (key,))
+                self._add_totals(entries=-1, bytes=-row[0])
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._db.execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)', (key, time.time()),
+        ).fetchone() is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute(
+                'SELECT value, size FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)', (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            db.execute('UPDATE cache SET value = ?, size = ? WHERE key = ?',
+                       (data, len(data), key))
+            self._add_totals(bytes=len(data) - row[1])
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        return value
+
+    def clear(self):
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.execute('DELETE FROM cache')
+            db.execute("UPDATE totals SET value = 0 "
+                       "WHERE name IN ('entries', 'bytes')")
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+
+    def stats(self):
+        """Счётчики попаданий, промахов и вытеснений по всем процессам."""
+        self._flush_stats()
+        return self._totals()
@@ -0,0 +1,129 @@
+"""Чтение с реплик и постоянные соединения с проверкой здоровья.
+
+Реплики задаются списком `DATABASE_REPLICAS`. С них читают только
+безопасные запросы (GET/HEAD) сайта; команды, воркер и всё, что пишет,
+работают с основной базой. После POST (новый пост, правка, комментарий,
+подписка) клиент получает куку и `REPLICA_PIN_SECONDS` секунд читает
+с основной базы, чтобы видеть свои изменения, пока реплики догоняют.
+Кэши с версиями заполняются только с основной базы (`primary_reads`).
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+PIN_COOKIE = 'yatube_primary'
+# сессии и очередь задач всегда читаются с основной базы
+PRIMARY_APPS = {'sessions', 'jobs'}
+
+_local = threading.local()
+_unhealthy = {}
+_checked = {}
+
+
+def replicas():
+    """Реплики, которые прошли последнюю проверку."""
+    now = time.monotonic()
+    return [alias for alias in getattr(settings, 'DATABASE_REPLICAS', ())
+            if _unhealthy.get(alias, 0) <= now]
+
+
+def replica_reads_enabled():
+    return getattr(_local, 'use_replicas', False)
+
+
+@contextmanager
+def replica_reads(enabled):
+    """Разрешить (или запретить) текущему потоку читать с реплик."""
+    previous = replica_reads_enabled()
+    _local.use_replicas = enabled
+    try:
+        yield
+    finally:
+        _local.use_replicas = previous
+
+
+def primary_reads():
+    """Читать с основной базы, даже в запросе с репликами.
+
+    Для всего, что кладётся в кэш под уже поднятой версией: отставшая
+    реплика сохранила бы под новой версией старые данные на весь TTL.
+    """
+    return replica_reads(False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not replica_reads_enabled():
+            return 'default'
+        if model._meta.app_label in PRIMARY_APPS:
+            return 'default'
+        if connections['default'].in_atomic_block:
+            return 'default'
+        available = replicas()
+        return random.choice(available) if available else 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def _interval():
+    return getattr(settings, 'DB_HEALTH_CHECK_INTERVAL', 30)
+
+
+def check(alias, connect=True):
+    """Проверить соединение; нерабочее закрыть, реплику отложить."""
+    connection = connections[alias]
+    try:
+        if connection.connection is None:
+            if not connect:
+                return True
+            connection.ensure_connection()
+        elif not connection.is_usable():
+            raise DatabaseError(f'{alias}: соединение не отвечает')
+    except DatabaseError:
+        connection.close()
+        _unhealthy[alias] = time.monotonic() + _interval()
+        return False
+    _unhealthy.pop(alias, None)
+    return True
+
+
+def check_connections():
+    """Проверки не чаще раза в DB_HEALTH_CHECK_INTERVAL для каждой базы."""
+    now = time.monotonic()
+    aliases = ['default'] + list(getattr(settings, 'DATABASE_REPLICAS', ()))
+    for alias in aliases:
+        if now - _checked.get(alias, float('-inf')) >= _interval():
+            _checked[alias] = now
+            # основную базу не открываем заранее, только проверяем
+            # уже открытое постоянное соединение
+            check(alias, connect=alias != 'default')
+
+
+class ReplicaMiddleware:
+    """Включает чтение с реплик для запроса и ставит куку после записи."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        safe = request.method in ('GET', 'HEAD', 'OPTIONS')
+        with replica_reads(safe and PIN_COOKIE not in request.COOKIES):
+            check_connections()
+            response = self.get_response(request)
+        if not safe:
+            response.set_cookie(
+                PIN_COOKIE, '1', httponly=True, samesite='Lax',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 10),
+            )
+        return response
@@ -0,0 +1,64 @@
+"""Независимые запросы одной страницы — параллельно в пуле потоков.
+
+Django 2.2 не умеет асинхронные view, поэтому запросы, которые не
+зависят друг от друга (подписка, счётчики, страница ленты), view отдаёт
+в `gather`. Каждый поток пула держит своё постоянное соединение с базой;
+чтение с реплик и замеры `yatube.perf` переносятся из потока запроса.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from . import db_router, perf
+
+_lock = threading.Lock()
+_executor = None
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.VIEW_THREADS,
+                thread_name_prefix='yatube-view',
+            )
+        return _executor
+
+
+def enabled():
+    if getattr(settings, 'VIEW_THREADS', 0) < 2:
+        return False
+    # незакоммиченные данные транзакции другим потокам не видны
+    return not connections['default'].in_atomic_block
+
+
+def _run(function, replicas, measure):
+    with db_router.replica_reads(replicas), perf.measured(measure) as metrics:
+        try:
+            return function(), metrics
+        finally:
+            close_old_connections()
+
+
+def gather(*functions):
+    """Вызвать функции без аргументов; вернуть результаты по порядку.
+
+    Первое исключение пробрасывается как есть, например Http404
+    из `get_object_or_404`.
+    """
+    if len(functions) < 2 or not enabled():
+        return [function() for function in functions]
+    replicas = db_router.replica_reads_enabled()
+    parent = perf.current()
+    futures = [_pool().submit(_run, function, replicas, parent is not None)
+               for function in functions]
+    results = []
+    for future in futures:
+        result, metrics = future.result()
+        if parent is not None:
+            parent.merge(metrics)
+        results.append(result)
+    return results
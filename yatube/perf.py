@@ -0,0 +1,268 @@
+"""Лёгкие замеры каждого запроса, пригодные для продакшена.
+
+`PerformanceMiddleware` считает время ответа, число и время SQL-запросов,
+время рендера шаблонов и попадания в кэш, отдаёт их клиенту в заголовке
+`Server-Timing` и копит гистограммы по имени URL. Гистограммы видны
+сотрудникам на `/perf/` и раз в `PERF_LOG_INTERVAL` секунд пишутся
+в лог `yatube.perf`.
+"""
+import bisect
+import json
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import connections
+from django.http import JsonResponse
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger('yatube.perf')
+
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+LOG_INTERVAL = 60
+
+_local = threading.local()
+
+
+class Metrics:
+    """Замеры одного запроса."""
+
+    __slots__ = ('queries', 'sql', 'template', 'template_depth',
+                 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.template = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def merge(self, other):
+        """Добавить замеры потока из пула `yatube.parallel`."""
+        self.queries += other.queries
+        self.sql += other.sql
+        self.template += other.template
+        self.cache_hits += other.cache_hits
+        self.cache_misses += other.cache_misses
+
+
+def current():
+    return getattr(_local, 'metrics', None)
+
+
+@contextmanager
+def paused():
+    """Не учитывать вложенные обращения (например, get внутри get_many)."""
+    metrics = current()
+    _local.metrics = None
+    try:
+        yield
+    finally:
+        _local.metrics = metrics
+
+
+@contextmanager
+def measured(enabled=True):
+    """Замерять запросы текущего потока; отдаёт Metrics или None."""
+    if not enabled:
+        yield None
+        return
+    metrics = Metrics()
+    _local.metrics = metrics
+    try:
+        with _timed(metrics):
+            yield metrics
+    finally:
+        _local.metrics = None
+
+
+def _timed(metrics):
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(_SQLTimer(metrics)))
+    return stack
+
+
+def record_cache(hits, misses):
+    metrics = current()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+class _SQLTimer:
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.metrics.queries += 1
+            self.metrics.sql += time.perf_counter() - start
+
+
+class TimedTemplate:
+    """Шаблон, который засекает время своего рендера."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        metrics = current()
+        if metrics is None:
+            return self.template.render(context, request)
+        metrics.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Бэкенд шаблонов Django с замером времени рендера."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class Histogram:
+    """Распределение времени ответа и суммы остальных замеров."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.totals = dict.fromkeys(
+            ('ms', 'queries', 'sql_ms', 'template_ms', 'cache_hits',
+             'cache_misses'), 0
+        )
+
+    def add(self, ms, metrics):
+        self.buckets[bisect.bisect_left(BUCKETS, ms)] += 1
+        self.count += 1
+        self.totals['ms'] += ms
+        self.totals['queries'] += metrics.queries
+        self.totals['sql_ms'] += metrics.sql * 1000
+        self.totals['template_ms'] += metrics.template * 1000
+        self.totals['cache_hits'] += metrics.cache_hits
+        self.totals['cache_misses'] += metrics.cache_misses
+
+    def percentile(self, percent):
+        """Верхняя граница корзины, в которую попадает процентиль."""
+        rank = percent / 100 * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (None,), self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return bound
+        return None
+
+    def as_dict(self):
+        labels = [f'le_{bound}' for bound in BUCKETS] + ['inf']
+        result = {
+            'count': self.count,
+            'buckets': dict(zip(labels, self.buckets)),
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+        }
+        for name, total in self.totals.items():
+            result[f'mean_{name}'] = round(total / self.count, 3)
+        return result
+
+
+class Registry:
+    """Гистограммы по имени URL в памяти процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.flushed = time.monotonic()
+
+    def record(self, name, ms, metrics):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(ms, metrics)
+
+    def snapshot(self):
+        with self.lock:
+            return {name: histogram.as_dict()
+                    for name, histogram in sorted(self.histograms.items())}
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+
+    def maybe_log(self):
+        interval = getattr(settings, 'PERF_LOG_INTERVAL', LOG_INTERVAL)
+        now = time.monotonic()
+        with self.lock:
+            if now - self.flushed < interval:
+                return
+            self.flushed = now
+        logger.info(json.dumps(self.snapshot(), sort_keys=True))
+
+
+registry = Registry()
+
+
+def url_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.url_name:
+        return 'unresolved'
+    return match.view_name
+
+
+def server_timing(ms, metrics):
+    return ', '.join((
+        f'app;dur={ms:.1f}',
+        f'db;dur={metrics.sql * 1000:.1f};desc="{metrics.queries} queries"',
+        f'tpl;dur={metrics.template * 1000:.1f}',
+        f'cache;desc="hit={metrics.cache_hits} miss={metrics.cache_misses}"',
+    ))
+
+
+class PerformanceMiddleware:
+    """Замеряет запрос целиком; ставится первым в MIDDLEWARE."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = Metrics()
+        _local.metrics = metrics
+        start = time.perf_counter()
+        try:
+            with _timed(metrics):
+                response = self.get_response(request)
+        finally:
+            _local.metrics = None
+        ms = (time.perf_counter() - start) * 1000
+
+        registry.record(url_name(request), ms, metrics)
+        if getattr(settings, 'PERF_SERVER_TIMING', True):
+            response['Server-Timing'] = server_timing(ms, metrics)
+        registry.maybe_log()
+        return response
+
+
+@staff_member_required
+def perf_stats(request):
+    return JsonResponse(registry.snapshot(),
+                        json_dumps_params={'ensure_ascii': False})
@@ -38,7 +38,10 @@ INSTALLED_APPS = [
     'about',
     'sorl.thumbnail',
     'users',
-    'posts',
+    'posts.apps.PostsConfig',
+    'jobs.apps.JobsConfig',
+    'benchmarks.apps.BenchmarksConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -57,6 +60,8 @@ INTERNAL_IPS = [
 ]
 
 MIDDLEWARE = [
+    'yatube.perf.PerformanceMiddleware',
+    'yatube.db_router.ReplicaMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -71,18 +76,33 @@ ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# кэширующий загрузчик: каждый шаблон читается и разбирается один раз
+# на процесс, а не при каждом рендере. Django включает его сам при
+# DEBUG=False; YATUBE_TEMPLATE_CACHE=1 включает его и при DEBUG
+TEMPLATE_CACHE = os.environ.get(
+    'YATUBE_TEMPLATE_CACHE', '0' if DEBUG else '1'
+) == '1'
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'yatube.perf.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': (
+                [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+                if TEMPLATE_CACHE else TEMPLATE_LOADERS
+            ),
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'posts.context_processors.year',
+                'posts.context_processors.feed_cache_ttl',
             ],
 
         },
@@ -95,13 +115,40 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# постоянные соединения: сколько секунд держать соединение между запросами
+CONN_MAX_AGE = int(os.environ.get('YATUBE_CONN_MAX_AGE', 60))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': CONN_MAX_AGE,
     }
 }
 
+# реплики только для чтения, через запятую (локально — копии SQLite-файла)
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+        filter(None, os.environ.get('YATUBE_DB_REPLICAS', '').split(',')),
+        start=1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['yatube.db_router.ReplicaRouter']
+# сколько секунд после своей записи клиент читает с основной базы
+REPLICA_PIN_SECONDS = 10
+# как часто проверять постоянные соединения и доступность реплик
+DB_HEALTH_CHECK_INTERVAL = 30
+# потоков для независимых запросов внутри одной страницы
+# (yatube.parallel); 0 — выполнять их по очереди. Выигрыш есть, когда
+# база по сети: на локальном SQLite запрос быстрее переключения потоков
+VIEW_THREADS = int(os.environ.get('YATUBE_VIEW_THREADS', 0))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -157,12 +204,57 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# sqlite — общий для всех воркеров кэш в файле SQLite с LRU-вытеснением,
+# locmem — отдельный кэш в памяти каждого процесса (по умолчанию для
+# разработки и тестов)
+CACHE_BACKENDS = {
+    'sqlite': {
+        'BACKEND': 'yatube.cache_backends.SQLiteCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_LOCATION', os.path.join(BASE_DIR, 'cache.sqlite3')
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MAX_BYTES': 256 * 1024 * 1024,
+        },
+    },
+    'locmem': {
+        'BACKEND': 'yatube.cache_backends.LocMemCache',
+    },
+}
+
 CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    'default': CACHE_BACKENDS[os.environ.get('YATUBE_CACHE', 'locmem')]
 }
 
+# номер выката; входит в ETag страниц, чтобы после обновления шаблонов
+# клиенты не получали 304 на старую разметку
+RELEASE = os.environ.get('YATUBE_RELEASE', '')
+
+# замеры запросов (yatube.perf): заголовок Server-Timing и период,
+# с которым гистограммы пишутся в лог yatube.perf
+PERF_SERVER_TIMING = True
+PERF_LOG_INTERVAL = 60
+
+if os.environ.get('YATUBE_PERF_LOG'):
+    LOGGING = {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'handlers': {
+            'perf': {
+                'class': 'logging.handlers.WatchedFileHandler',
+                'filename': os.environ['YATUBE_PERF_LOG'],
+            },
+        },
+        'loggers': {
+            'yatube.perf': {'handlers': ['perf'], 'level': 'INFO'},
+        },
+    }
+
+# время жизни кэша лент и карточек постов; устаревшие версии
+# отсекаются сигналами, поэтому TTL может быть большим
+FEED_CACHE_TTL = 60 * 60 * 3
+
 
 # Login
 
@@ -171,6 +263,36 @@ LOGIN_REDIRECT_URL = "index"
 LOGOUT_REDIRECT_URL = "index"
 
 PAGINATOR_PAGE_SIZE = 10
+COMMENTS_PAGE_SIZE = 20
+
+# отдавать ленты и страницы постов потоком (posts.streaming): начало
+# страницы уходит клиенту до рендера карточек и комментариев
+STREAMING_PAGES = os.environ.get('YATUBE_STREAMING_PAGES') == '1'
+
+# сколько секунд клиенты и прокси могут хранить публичные ответы API
+API_CACHE_MAX_AGE = 30
+
+# выполнять фоновые задачи сразу после коммита, без воркера run_jobs
+JOBS_EAGER = os.environ.get('YATUBE_JOBS_EAGER') == '1'
+# сколько секунд хранить выполненные задачи; старые удаляет воркер
+JOBS_KEEP_DONE = 24 * 60 * 60
+
+# откладывать подписки и комментарии в локальный буфер и переносить их
+# в базу пачками командой flush_writes (posts.write_behind)
+WRITE_BEHIND = os.environ.get('YATUBE_WRITE_BEHIND') == '1'
+WRITE_BEHIND_PATH = os.environ.get(
+    'YATUBE_WRITE_BEHIND_PATH', os.path.join(BASE_DIR, 'writes.sqlite3')
+)
+# пауза flush_writes между пачками, когда буфер пуст
+WRITE_BEHIND_INTERVAL = 0.5
+
+# сколько последних записей хранится в ленте подписок пользователя
+TIMELINE_LENGTH = 1000
+# на сколько записей лента может перерасти TIMELINE_LENGTH до обрезки
+TIMELINE_SLACK = 100
+# до скольких подписчиков пост раскладывается по лентам прямо в запросе;
+# для большей аудитории — задачей воркера run_jobs
+TIMELINE_INLINE_FOLLOWERS = 100
 
 
 #  подключаем движок filebased.EmailBackend
@@ -5,11 +5,14 @@ from django.contrib import admin
 from django.urls import include, path
 
 from posts.views import page_not_found, server_error
+from yatube.perf import perf_stats
 
 urlpatterns = [
     path("auth/", include("users.urls")),
     path("auth/", include("django.contrib.auth.urls")),
     path('admin/', admin.site.urls),
+    path('perf/', perf_stats, name='perf_stats'),
+    path('api/v1/', include('api.urls', namespace='api')),
     path('', include('posts.urls')),
     path('404/', page_not_found, name='404'),
     path('500/', server_error, name='500'),